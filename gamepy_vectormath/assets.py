@@ -0,0 +1,84 @@
+# process wide image registry. Every file is decoded and converted only once
+# and all objects share the same surface. start() decodes files on a thread pool
+# ahead of time, the conversion to the display format always happens in load_image()
+# on the main thread.
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# files used by the game, loaded up front by preload()
+IMAGES = {
+    "gfx/arena.png": False,
+    "gfx/menu.png": True,
+    "gfx/won.png": True,
+    "gfx/lost.png": True,
+    "gfx/body.png": True,
+    "gfx/tower.png": True,
+    "gfx/rocket_pod_base.png": True,
+    "gfx/rocket_pod_tower.png": True,
+    "gfx/rocket.png": True,
+    "gfx/crate.png": True,
+    "gfx/health.png": True,
+    "gfx/no2.png": True,
+}
+
+_images = {}
+_converted = set()
+_decoding = {}  # path -> future of the decoded surface
+_pool = None
+
+
+def load_image(path: str, alpha: bool = None) -> pygame.Surface:
+    """returns the shared surface for path. Loads the file on first use and converts it to the display format once a display exists."""
+    if alpha is None:
+        alpha = IMAGES.get(path, True)
+
+    image = _images.get(path)
+    if image is None:
+        future = _decoding.pop(path, None)
+        if future is not None:
+            image = future.result()
+        else:
+            image = pygame.image.load(os.path.join(BASE_DIR, path))
+        _images[path] = image
+
+    if path not in _converted and pygame.display.get_surface() is not None:
+        if alpha and image.get_colorkey() is None:
+            image = image.convert_alpha()
+        else:
+            image = image.convert()
+        _images[path] = image
+        _converted.add(path)
+
+    return image
+
+
+def start(paths: list = None, workers: int = 4):
+    """starts decoding images (default: all of IMAGES) on a thread pool, in the given order.
+    Files already loaded or on their way are skipped."""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=workers)
+    if paths is None:
+        paths = list(IMAGES)
+    for path in paths:
+        if path not in _images and path not in _decoding:
+            _decoding[path] = _pool.submit(pygame.image.load, os.path.join(BASE_DIR, path))
+
+
+def decoded(path: str) -> bool:
+    """True when load_image(path) won't have to wait for the file"""
+    if path in _images:
+        return True
+    future = _decoding.get(path)
+    return future is not None and future.done()
+
+
+def preload(paths: dict = None):
+    """loads and converts all images. Call after pygame.display.set_mode()."""
+    if paths is None:
+        paths = IMAGES
+    for path, alpha in paths.items():
+        load_image(path, alpha)
@@ -0,0 +1,141 @@
+# batch runner for balancing. Plays many headless matches on a pool of processes and
+# prints one JSON line per match as soon as it is finished.
+#
+#   python batch.py --runs 1000                                  1000 matches, default values
+#   python batch.py --set enemy.reload_time=1.5 --set player.max_ammo=30 --set player.ammo=30
+#   python batch.py --sweep enemy.rocket_agility=1,2,3 --runs 200  200 matches per value
+#   python batch.py --policy shooter --out results.jsonl          also append the results to a file
+#
+# Parameters are attribute paths on the GameSession and are set right after it is built.
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is for the results, not the pygame banner
+import pygame
+from headless import init_headless, run_headless
+from inputs import BotInput, ScriptedInput
+
+
+def shooter(session: object, max_ticks: int) -> ScriptedInput:
+    """stands still and fires at the rocket pod twice a second"""
+    pos = session.enemy.pos
+    clicks = {t: [pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=(pos.x, pos.y))]
+              for t in range(0, max_ticks, 30)}
+    return ScriptedInput(clicks, start_mouse=(pos.x, pos.y))
+
+
+def bot(session: object, max_ticks: int) -> BotInput:
+    """drives around and fires whenever the tank is ready"""
+    return BotInput(session, seed=session.seed)
+
+
+# name: builds the input source for a session
+POLICIES = {
+    "bot": bot,
+    "shooter": shooter,
+}
+
+
+def parse_value(text: str) -> object:
+    """numbers, booleans and lists as JSON, anything else stays a string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def set_param(obj: object, path: str, value: object):
+    """sets a dotted attribute path like "enemy.reload_time". A list on the way applies
+    the rest of the path to every element."""
+    name, _, rest = path.partition(".")
+    if isinstance(obj, list):
+        for item in obj:
+            set_param(item, path, value)
+    elif rest:
+        set_param(getattr(obj, name), rest, value)
+    else:
+        setattr(obj, name, value)
+
+
+def init_worker():
+    init_headless()
+
+
+def play(job: dict) -> dict:
+    """plays one match and returns its outcome"""
+    from main import GameSession
+    session = GameSession(pygame.display.get_surface(), pygame.time.Clock(), headless=True, seed=job["seed"])
+    for path, value in job["params"].items():
+        set_param(session, path, value)
+    session.inputs = POLICIES[job["policy"]](session, job["max_ticks"])
+
+    outcome = run_headless(session, job["max_ticks"])
+    return {
+        "seed": job["seed"],
+        "policy": job["policy"],
+        "params": job["params"],
+        "result": outcome["result"] or "timeout",
+        "ticks": outcome["ticks"],
+        "damage_taken": 100 - session.player.health,
+        "damage_dealt": 100 - session.enemy.health,
+        "ammo_used": session.player.shots,
+        "seconds": round(outcome["seconds"], 4),
+    }
+
+
+def jobs(runs: int, params: dict, sweep: dict, policy: str, max_ticks: int, seed: int = 1):
+    """one job per combination of sweep values and run, every run has its own seed"""
+    names = list(sweep)
+    for values in itertools.product(*sweep.values()):
+        combination = dict(params, **dict(zip(names, values)))
+        for run in range(runs):
+            yield {"seed": seed + run, "policy": policy, "params": combination, "max_ticks": max_ticks}
+
+
+def run_batch(job_list, processes: int = None):
+    """plays all jobs on a process pool and yields the outcomes in the order they finish"""
+    with multiprocessing.Pool(processes, initializer=init_worker) as pool:
+        yield from pool.imap_unordered(play, job_list)
+        # let the workers exit on their own, terminating them can hang
+        pool.close()
+        pool.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="plays many headless matches on all cores")
+    parser.add_argument("--runs", type=int, default=100, help="matches per parameter combination")
+    parser.add_argument("--policy", default="bot", help=f"any of {', '.join(POLICIES)}")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 3, help="a match ends as timeout after this")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first run")
+    parser.add_argument("--set", action="append", default=[], metavar="PATH=VALUE")
+    parser.add_argument("--sweep", action="append", default=[], metavar="PATH=V1,V2,...")
+    parser.add_argument("--processes", type=int, default=None, help="default: one per core")
+    parser.add_argument("--out", help="append the results to this file (JSON lines)")
+    args = parser.parse_args()
+    if args.policy not in POLICIES:
+        parser.error(f"unknown policy {args.policy}")
+
+    params = {}
+    for item in args.set:
+        path, _, value = item.partition("=")
+        params[path] = parse_value(value)
+    sweep = {}
+    for item in args.sweep:
+        path, _, values = item.partition("=")
+        sweep[path] = [parse_value(v) for v in values.split(",")]
+
+    start = time.perf_counter()
+    count = 0
+    for result in run_batch(jobs(args.runs, params, sweep, args.policy, args.max_ticks, args.seed), args.processes):
+        count += 1
+        line = json.dumps(result)
+        print(line, flush=True)
+        if args.out:
+            with open(args.out, "a") as f:
+                f.write(line + "\n")
+    seconds = time.perf_counter() - start
+    print(f"{count} matches in {seconds:.1f} s", file=sys.stderr)
@@ -0,0 +1,260 @@
+# deterministic benchmarks. Builds scripted scenarios, runs them headless and
+# prints one JSON line per scenario with per-phase timings and frames per second.
+#
+#   python benchmark.py                      all scenarios
+#   python benchmark.py rockets --ticks 300  one scenario
+#   python benchmark.py --out results.jsonl  also append the results to a file
+#   python benchmark.py --tunneling          discrete vs. swept collisions at lower tick rates
+#   python benchmark.py --startup            time to the first frame and to a started game
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is for the results, not the pygame banner
+import pygame
+from headless import init_headless
+from inputs import ScriptedInput
+from perf import PhaseTimer
+from projectiles import Rocket, TankRound, ProjectileCollection
+
+
+def commit() -> str:
+    """current git commit, so results of different commits can be compared"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def shooting_input(ticks: int) -> ScriptedInput:
+    """drives in circles and shoots at the rocket pod"""
+    events = {0: [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP),
+                  pygame.event.Event(pygame.KEYDOWN, key=pygame.K_LEFT)]}
+    for t in range(0, ticks, 31):
+        events.setdefault(t, []).append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=(400, 300)))
+    return ScriptedInput(events, start_mouse=(400, 300))
+
+
+def match(window: pygame.Surface, ticks: int, size: int, seed: int):
+    """a regular game session with a scripted player"""
+    from main import GameSession
+    session = GameSession(window, pygame.time.Clock(), inputs=shooting_input(ticks), headless=True, seed=seed)
+    return session, None
+
+
+def rockets(window: pygame.Surface, ticks: int, size: int, seed: int):
+    """size rockets coming in from a ring around the tank"""
+    from main import GameSession
+    session = GameSession(window, pygame.time.Clock(), inputs=ScriptedInput(), headless=True, seed=seed)
+    tank = session.player.tank
+    session.player.health = float("inf")
+    for i in range(size):
+        direction = pygame.math.Vector2(1, 0).rotate(random.uniform(0, 360))
+        pos = tank.pos + direction * random.uniform(1000, 3000)
+        session.projectiles.add(Rocket(pos, -direction.rotate(random.uniform(-90, 90)), tank, vel=3.5, agility=2))
+    return session, None
+
+
+def world(window: pygame.Surface, ticks: int, size: int, seed: int):
+    """size rockets spread over an arena 64 times the window, the camera follows the tank
+    through it. Render cost should depend on what is on screen, not on the arena."""
+    from main import GameSession
+    session = GameSession(window, pygame.time.Clock(), inputs=shooting_input(ticks), headless=True, seed=seed,
+                          world_size=(6400, 4800))
+    tank = session.player.tank
+    session.player.health = float("inf")
+    for i in range(size):
+        pos = pygame.math.Vector2(random.uniform(0, 6400), random.uniform(0, 4800))
+        session.projectiles.add(Rocket(pos, pygame.math.Vector2(1, 0).rotate(random.uniform(0, 360)), tank,
+                                       vel=3.5, agility=2))
+    return session, None
+
+
+def crates(window: pygame.Surface, ticks: int, size: int, seed: int):
+    """spawns crates every tick until size of them are lying around"""
+    from main import GameSession
+    session = GameSession(window, pygame.time.Clock(), inputs=shooting_input(ticks), headless=True, seed=seed)
+    session.crates.max_items = size
+
+    def before_step(tick: int):
+        for i in range(5):
+            if len(session.crates.items) < size:
+                session.crates.spawn_item()
+
+    return session, before_step
+
+
+def tunneling(sim_rate: int, swept: bool, rockets: int = 200, rounds: int = 400, seconds: float = 3, seed: int = 1) -> tuple:
+    """fires one round along each row of a field of parked rockets. Rows are far enough apart
+    that a round can only hit rockets of its own row, so every row with a rocket is one hit.
+    Returns (hits, expected hits)."""
+    random.seed(seed)
+    collection = ProjectileCollection(swept=swept)
+    target = TankRound(pygame.math.Vector2(0, 0), pygame.math.Vector2(1, 0))  # anything with a pos
+    cells = random.sample([(x, y) for x in range(8, 40) for y in range(rounds)], rockets)
+    for x, y in cells:
+        pos = pygame.math.Vector2(x * 40 + random.uniform(0, 19), y * 40 + random.uniform(-10, 10))
+        collection.add(Rocket(pos, pygame.math.Vector2(0, 1), target, vel=0, agility=0))
+    fired = [TankRound(pygame.math.Vector2(random.uniform(0, 40), y * 40), pygame.math.Vector2(1, 0))
+             for y in range(rounds)]
+    for r in fired:
+        collection.add(r)
+
+    dt = 1 / sim_rate
+    for tick in range(int(seconds * sim_rate)):
+        collection.move(dt)
+        collection.collide()
+    return sum(r.get_destroy() for r in fired), len({y for x, y in cells})
+
+
+def compare_sweeping(rates: tuple = (60, 30, 20, 15, 10), seconds: float = 3, seed: int = 1) -> list:
+    """hit accuracy and cost of the discrete and the swept test at several simulation rates"""
+    results = []
+    for rate in rates:
+        for swept in (False, True):
+            start = time.perf_counter()
+            hits, expected = tunneling(rate, swept, seconds=seconds, seed=seed)
+            elapsed = time.perf_counter() - start
+            results.append({
+                "sketch": "gamepy_vectormath",
+                "scenario": "tunneling",
+                "commit": commit(),
+                "seed": seed,
+                "sim_rate": rate,
+                "swept": swept,
+                "hits": hits,
+                "expected_hits": expected,
+                "accuracy": round(hits / expected, 4),
+                "ms_per_second": round(elapsed * 1000 / seconds, 4),
+            })
+    return results
+
+
+# name: (scenario, default size)
+SCENARIOS = {
+    "match": (match, 0),
+    "rockets": (rockets, 500),
+    "crates": (crates, 300),
+    "world": (world, 500),
+}
+
+
+def run(name: str, ticks: int = 600, size: int = None, seed: int = 1, render: bool = True,
+        render_mode: str = "dirty") -> dict:
+    scenario, default_size = SCENARIOS[name]
+    if size is None:
+        size = default_size
+    window = pygame.display.get_surface()
+    random.seed(seed)
+    session, before_step = scenario(window, ticks, size, seed)
+    session.render_mode = render_mode  # "dirty" or "full"
+    timer = PhaseTimer(window=ticks)
+    session.timer = timer
+
+    collections = sum(s["collections"] for s in gc.get_stats())
+    start = time.perf_counter()
+    for tick in range(ticks):
+        if before_step is not None:
+            before_step(tick)
+        session.step()
+        if render:
+            session.render()
+        timer.end_frame()
+    seconds = time.perf_counter() - start
+    collections = sum(s["collections"] for s in gc.get_stats()) - collections
+
+    return {
+        "sketch": "gamepy_vectormath",
+        "scenario": name,
+        "commit": commit(),
+        "seed": seed,
+        "size": size,
+        "render_mode": render_mode,
+        "ticks": ticks,
+        "seconds": round(seconds, 4),
+        "fps": round(ticks / seconds, 1),
+        "ms_per_frame": {phase: round(ms, 4) for phase, ms in timer.report(ticks).items()},
+        "frame_ms": {name: round(ms, 4) for name, ms in timer.percentiles().items()},
+        "gc_collections": collections,
+        "memory": session.memory_report(),
+    }
+
+
+# runs in a fresh interpreter: opens the menu, then starts a game either right after the
+# first frame or once the warm-up is done
+STARTUP = """
+import json, sys, time
+from main import Application, GameSession
+app = Application()
+app.render()
+if sys.argv[1] == "warm":
+    while not app.warm_up(1.0):
+        pass
+start = time.perf_counter()
+GameSession(app.window, app.clock)
+print(json.dumps({"first_frame": app.first_frame, "play": time.perf_counter() - start}))
+"""
+
+
+def startup(runs: int = 5) -> dict:
+    """cold start timings, medians of several runs in new processes"""
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {"cold": [], "warm": []}
+    for run in range(runs):
+        for mode in results:
+            out = subprocess.run([sys.executable, "-c", STARTUP, mode], cwd=here, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            results[mode].append(json.loads(out.strip().splitlines()[-1]))
+
+    def median_ms(mode, key):
+        return round(statistics.median(r[key] for r in results[mode]) * 1000, 2)
+
+    return {
+        "sketch": "gamepy_vectormath",
+        "scenario": "startup",
+        "commit": commit(),
+        "runs": runs,
+        "first_frame_ms": median_ms("cold", "first_frame"),
+        "play_right_away_ms": median_ms("cold", "play"),
+        "play_after_warm_up_ms": median_ms("warm", "play"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="runs the benchmark scenarios headless")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--size", type=int, default=None, help="scenario size, e.g. number of rockets")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-render", action="store_true")
+    parser.add_argument("--render-mode", choices=("dirty", "full"), default="dirty",
+                        help="dirty rect updates or a full redraw and flip every frame (default: dirty)")
+    parser.add_argument("--out", help="append the results to this file (JSON lines)")
+    parser.add_argument("--tunneling", action="store_true",
+                        help="compare hit accuracy and cost of discrete and swept collisions instead")
+    parser.add_argument("--startup", action="store_true", help="measure the cold start instead")
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    init_headless()
+    if args.startup:
+        results = [startup()]
+    elif args.tunneling:
+        results = compare_sweeping(seed=args.seed)
+    else:
+        results = (run(name, args.ticks, args.size, args.seed, not args.no_render, args.render_mode) for name in args.scenarios or SCENARIOS)
+    for result in results:
+        line = json.dumps(result)
+        print(line)
+        if args.out:
+            with open(args.out, "a") as f:
+                f.write(line + "\n")
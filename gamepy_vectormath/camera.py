@@ -0,0 +1,41 @@
+# camera for arenas larger than the window. Everything in the game lives in world
+# coordinates, the camera decides which part of the world the window shows and
+# converts between world and screen coordinates.
+import numpy as np
+import pygame
+
+
+class Camera:
+    """The part of the world shown in the window. view is that part in world coordinates,
+    it follows a target and never leaves the world."""
+
+    def __init__(self, view_size: tuple, world_size: tuple) -> None:
+        self.view = pygame.Rect((0, 0), view_size)
+        self.world = pygame.Rect((0, 0), world_size)
+
+    @property
+    def offset(self) -> tuple:
+        """world position of the top left window corner"""
+        return self.view.topleft
+
+    def follow(self, pos: pygame.math.Vector2):
+        """centers the view on pos, as far as the world allows"""
+        self.view.center = pos
+        self.view.clamp_ip(self.world)
+
+    def to_screen(self, pos: tuple) -> tuple:
+        return (pos[0] - self.view.x, pos[1] - self.view.y)
+
+    def to_world(self, pos: tuple) -> tuple:
+        return (pos[0] + self.view.x, pos[1] + self.view.y)
+
+    def sees(self, dest: tuple, size: tuple) -> bool:
+        """True if a sprite of size drawn at the screen position dest is (partly) in the window"""
+        return dest[0] < self.view.width and dest[1] < self.view.height and dest[0] + size[0] > 0 and dest[1] + size[1] > 0
+
+    def visible(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """True for every box (corners low and high, (n, 2) arrays in world coordinates)
+        that overlaps the view"""
+        view = self.view
+        return ((low[:, 0] < view.right) & (high[:, 0] > view.left)
+                & (low[:, 1] < view.bottom) & (high[:, 1] > view.top))
@@ -1,7 +1,10 @@
 import pygame
 from projectiles import Rocket, ProjectileCollection, TankRound
-import math
-from helpers import angle_between_vectors
+from helpers import steer_towards, REFERENCE_RATE
+from assets import load_image
+from rotation import rotation_cache
+from render import RenderQueue, GROUND
+from text import render_text
 
 
 class RocketPod:
@@ -9,10 +12,13 @@ class RocketPod:
 
     def __init__(self, pos: pygame.math.Vector2, collection: ProjectileCollection, target: object) -> None:
         self.pos = pos
-        self.base = pygame.image.load("gfx/rocket_pod_base.png")
-        self.tower = pygame.image.load("gfx/rocket_pod_tower.png")
+        self.base = load_image("gfx/rocket_pod_base.png")
+        self.tower_rotations = rotation_cache("gfx/rocket_pod_tower.png")
         self.heading = pygame.math.Vector2(0, 1)
-        self.timer = 90
+        self.timer = 1.5  # seconds until the next launch
+        self.reload_time = 2
+        self.rocket_vel = 3.5
+        self.rocket_agility = 2
         self.collection = collection
         self.target = target
         self.health = 100
@@ -20,53 +26,37 @@ class RocketPod:
         self.hitbox = pygame.Rect(0, 0, 100, 100)
         self.hitbox.center = self.pos
 
-    def update(self):
+    def update(self, dt: float):
         """launches rockets every X seconds and turns itself into the players direction"""
 
         if self.timer > 0:
-            self.timer -= 1
+            self.timer -= dt
         else:
             self.launch_rocket()
-            self.timer = 120
+            self.timer = self.reload_time
 
+        # turn the tower towards the target
         target_direction = self.target.pos - self.pos
-        angle_CCW = angle_between_vectors(
-            self.heading, target_direction)
-
-        # steer rocket
-        if angle_CCW > self.agility:
-            self.heading = self.heading.rotate(self.agility)
-        elif angle_CCW < -self.agility:
-            self.heading = self.heading.rotate(-self.agility)
-        else:
-            self.heading = target_direction.normalize()
+        self.heading = steer_towards(
+            self.heading, target_direction, self.agility * dt * REFERENCE_RATE)
 
     def launch_rocket(self):
-        self.collection.alive_projectiles.append(
-            Rocket(self.pos, self.heading, self.target, vel=3.5, agility=2))
-
-    def get_hit(self, items: list):
-        for i in items:
-            if self.hitbox.colliderect(i.hitbox):
-                # only count hits form the rocket class.
-                if isinstance(i, TankRound):
-                    print(f"got a hit from: {type(i)}")
-                    i.destroy()
-                    self.health -= 5
+        self.collection.spawn(
+            Rocket, self.pos, self.heading, self.target, vel=self.rocket_vel, agility=self.rocket_agility)
 
-    def draw(self, window: pygame.Surface):
-        offset_b = pygame.math.Vector2(self.base.get_rect().center)
-        window.blit(self.base, self.pos - offset_b)
+    def get_hit(self, tank_round: TankRound):
+        """collision handler for the rounds of the tank, its own rockets do no harm"""
+        tank_round.destroy()
+        self.health -= 5
 
-        direction_tower = pygame.math.Vector2(0, -1).angle_to(self.heading)
-        tower = pygame.transform.rotate(self.tower, - direction_tower),
-        offset_t = pygame.math.Vector2(tower[0].get_rect().center)
-        window.blit(tower[0], self.pos - offset_t)
+    def submit(self, queue: RenderQueue):
+        queue.add_centered(self.base, self.pos, GROUND)
+        tower, offset_t = self.tower_rotations.get_heading(self.heading)
+        queue.add(tower, self.pos - offset_t, GROUND)
 
-    def draw_ui(self, window: pygame.Surface):
-        font = pygame.font.Font(None, 24)
+    def draw_ui(self, window: pygame.Surface) -> list:
         health_str = f"Enemy Health: {self.health}"
-        health = font.render(health_str, True,  (10, 10, 10))
+        health = render_text(health_str, 24, (10, 10, 10))
         x_offset = pygame.display.get_surface().get_size()[
             0] - health.get_rect()[2] - 10
-        window.blit(health, (x_offset, 10))
+        return [window.blit(health, (x_offset, 10))]
@@ -0,0 +1,50 @@
+# headless simulation. Runs game sessions without a window (SDL dummy video
+# driver), without rendering and without waiting for the clock.
+import json
+import os
+import sys
+import time
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is for the results, not the pygame banner
+import pygame
+from assets import preload
+
+
+def init_headless(size: tuple = (800, 600)) -> pygame.Surface:
+    """starts pygame on the dummy video driver and returns the (invisible) window"""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.init()
+    window = pygame.display.set_mode(size)
+    preload()
+    return window
+
+
+def run_headless(session: object, max_ticks: int = None) -> dict:
+    """steps a session with its fixed dt as fast as possible until it ends or max_ticks are reached"""
+    ticks = 0
+    result = None
+    start = time.perf_counter()
+    while result is None and (max_ticks is None or ticks < max_ticks):
+        result = session.step()
+        ticks += 1
+    seconds = time.perf_counter() - start
+    return {
+        "result": result,
+        "ticks": ticks,
+        "seconds": seconds,
+        "tps": ticks / seconds if seconds > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    from inputs import ScriptedInput
+    from main import GameSession
+
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    window = init_headless()
+    # fire at the rocket pod every 30 ticks
+    clicks = {t: [pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=(400, 300))]
+              for t in range(0, ticks, 30)}
+    session = GameSession(window, pygame.time.Clock(),
+                          inputs=ScriptedInput(clicks, start_mouse=(400, 300)), headless=True)
+    print(json.dumps(run_headless(session, ticks)))
@@ -1,25 +1,45 @@
-import math
+import numpy as np
+import pygame
 
-# thank you chat-gpt for this one!
+# speeds, accelerations and agilities are given per tick of this rate (1/60 s).
+# Updates scale them by dt * REFERENCE_RATE.
+REFERENCE_RATE = 60
 
-def angle_between_vectors(v1, v2):
-        """returns the angle in between v1 and v2 from 180° to -180°"""
-        dot_product = v1[0] * v2[0] + v1[1] * v2[1]
-        magnitude_v1 = math.sqrt(v1[0]**2 + v1[1]**2)
-        magnitude_v2 = math.sqrt(v2[0]**2 + v2[1]**2)
-        cos_theta = dot_product / (magnitude_v1 * magnitude_v2)
 
-        if cos_theta > 1:
-            cos_theta = 1
-        elif cos_theta < -1:
-            cos_theta = -1
+def steer(headings: np.ndarray, targets: np.ndarray, agilities, thresholds=None, snap: bool = True) -> np.ndarray:
+    """Batched homing kernel. headings and targets (target directions) are (n, 2) arrays.
+    Turns every heading by its agility (degrees) towards its target. Headings that are
+    within the threshold (default: the agility) are snapped onto the normalized target,
+    or left alone if snap is False. Uses the cross and dot product only, no acos."""
+    agilities = np.asarray(agilities, dtype=float)
+    thresholds = agilities if thresholds is None else np.asarray(thresholds, dtype=float)
+    hx, hy = headings[:, 0], headings[:, 1]
+    tx, ty = targets[:, 0], targets[:, 1]
+    cross = hx * ty - hy * tx
+    dot = hx * tx + hy * ty
 
-        angle_radians = math.acos(cos_theta)
-        angle_degrees = math.degrees(angle_radians)
+    # the sign of sin(angle - threshold) tells if the target is further away than the threshold
+    t = np.radians(thresholds)
+    cos_t = np.cos(t)
+    sin_t = np.sin(t)
+    left = (cross >= 0) & (cross * cos_t - dot * sin_t > 0)
+    right = (cross < 0) & (-cross * cos_t - dot * sin_t > 0)
 
-        # Determine the sign of the angle using the cross product
-        cross_product = v1[0] * v2[1] - v1[1] * v2[0]
-        if cross_product < 0:
-            angle_degrees = -angle_degrees
+    turn = np.radians(np.where(left, agilities, np.where(right, -agilities, 0.0)))
+    c = np.cos(turn)
+    s = np.sin(turn)
+    result = np.stack((hx * c - hy * s, hx * s + hy * c), axis=1)
 
-        return angle_degrees
\ No newline at end of file
+    if snap:
+        length = np.hypot(tx, ty)
+        on_target = ~(left | right) & (length > 0)
+        result[on_target] = targets[on_target] / length[on_target, None]
+
+    return result
+
+
+def steer_towards(heading: pygame.math.Vector2, target_direction: pygame.math.Vector2, agility: float, threshold: float = None, snap: bool = True) -> pygame.math.Vector2:
+    """single object version of steer()"""
+    result = steer(np.array([heading], dtype=float), np.array([target_direction], dtype=float),
+                   agility, threshold, snap)
+    return pygame.math.Vector2(result[0, 0], result[0, 1])
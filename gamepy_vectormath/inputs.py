@@ -0,0 +1,71 @@
+# input sources. The game reads events and the mouse through one of these so the
+# simulation can also be driven by a script instead of a real player.
+import random
+import pygame
+
+
+class PygameInput:
+    """Reads the input of the player from pygame."""
+
+    def events(self) -> list:
+        return pygame.event.get()
+
+    def mouse_pos(self) -> tuple:
+        return pygame.mouse.get_pos()
+
+
+class ScriptedInput:
+    """Plays back prepared input. events maps a tick to a list of pygame events,
+    mouse maps a tick to a mouse position that stays until the next entry."""
+
+    def __init__(self, events: dict = None, mouse: dict = None, start_mouse: tuple = (0, 0)) -> None:
+        self.script = events if events is not None else {}
+        self.mouse = mouse if mouse is not None else {}
+        self.tick = -1
+        self.pos = start_mouse
+
+    def events(self) -> list:
+        # called once per tick, so it advances the script
+        self.tick += 1
+        self.pos = self.mouse.get(self.tick, self.pos)
+        return self.script.get(self.tick, [])
+
+    def mouse_pos(self) -> tuple:
+        return self.pos
+
+
+class BotInput:
+    """Simple computer player: drives in curves that change direction at random and shoots
+    at the rocket pod whenever the tank is ready. Reads the state of its session."""
+
+    def __init__(self, session: object = None, min_turn: int = 60, max_turn: int = 240, seed: int = None) -> None:
+        self.session = session
+        self.rng = random.Random(seed)
+        self.min_turn = min_turn  # ticks between changes of direction
+        self.max_turn = max_turn
+        self.tick = -1
+        self.turn = 0
+        self.next_turn = 0
+
+    def events(self) -> list:
+        self.tick += 1
+        events = []
+        if self.tick == 0:
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+        if self.tick == self.next_turn:
+            keys = {-1: pygame.K_LEFT, 1: pygame.K_RIGHT}
+            if self.turn:
+                events.append(pygame.event.Event(pygame.KEYUP, key=keys[self.turn]))
+            self.turn = self.rng.choice((-1, 0, 1))
+            if self.turn:
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=keys[self.turn]))
+            self.next_turn = self.tick + self.rng.randint(self.min_turn, self.max_turn)
+
+        player = self.session.player
+        if player.ammo > 0 and player.reload_timer == 0:
+            events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=self.mouse_pos()))
+        return events
+
+    def mouse_pos(self) -> tuple:
+        # the mouse is on the screen, the enemy in the world
+        return self.session.camera.to_screen(self.session.enemy.pos)
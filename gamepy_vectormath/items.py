@@ -1,55 +1,68 @@
 import pygame
-from random import randint
+import random
+from assets import load_image
+from storage import SlotStore
+from render import RenderQueue, GROUND
 
 
 class Item:
     """Baseclass for all items"""
+    __slots__ = ("pos", "size", "hitbox", "sprite", "collected", "handle", "type")
+    sprite_file = "gfx/crate.png"
+
     def __init__(self, pos: pygame.math.Vector2) -> None:
         self.pos = pos
         self.size = 50
         self.hitbox = pygame.Rect(0, 0, self.size, self.size)
         self.hitbox.center = self.pos
-        self.sprite = pygame.image.load("gfx/crate.png")
+        self.sprite = load_image(self.sprite_file)
         self.collected = False
+        self.handle = None  # set by the ItemCollection
 
-    def draw(self, window: pygame.Surface):
-        offset = pygame.math.Vector2(self.sprite.get_rect().center)
-        window.blit(self.sprite, self.pos - offset)
+    def submit(self, queue: RenderQueue):
+        queue.add_centered(self.sprite, self.pos, GROUND)
 
     def collect(self):
         self.collected = True
 
 class AmmoCrate(Item):
+    __slots__ = ()
+
     def __init__(self, pos: pygame.Vector2) -> None:
         super().__init__(pos)
-        self.sprite = pygame.image.load("gfx/crate.png")
         self.type = "ammo"
 
 class HealthCrate(Item):
+    __slots__ = ()
+    sprite_file = "gfx/health.png"
+
     def __init__(self, pos: pygame.Vector2) -> None:
         super().__init__(pos)
-        self.sprite = pygame.image.load("gfx/health.png")
         self.type = "health"
 
 class BoostCrate(Item):
+    __slots__ = ()
+    sprite_file = "gfx/no2.png"
+
     def __init__(self, pos: pygame.Vector2) -> None:
         super().__init__(pos)
-        self.sprite = pygame.image.load("gfx/no2.png")
         self.type = "boost"
 
 class ItemCollection:
     """Class that manages all items."""
-    def __init__(self, max_items: int = 2) -> None:
-        self.items = []
+    def __init__(self, max_items: int = 2, rng: random.Random = None, size: tuple = None) -> None:
+        self.rng = rng if rng is not None else random.Random()
+        self.items = SlotStore()
         self.destruct_items = []
         self.max_items = max_items
-        self.timer = 0
-        self.boundries = pygame.display.get_surface().get_size()
+        self.timer = 0  # seconds since the last spawn
+        # items spawn anywhere in the arena, default: the window
+        self.boundries = size if size is not None else pygame.display.get_surface().get_size()
 
-    def upate(self):
+    def upate(self, dt: float):
         # spawn new items
-        self.timer += 1
-        if self.timer > 300 and len(self.items) < self.max_items:
+        self.timer += dt
+        if self.timer > 5 and len(self.items) < self.max_items:
             self.spawn_item()
             self.timer = 0
         
@@ -61,27 +74,27 @@ class ItemCollection:
         self.destroy_crates()
 
     def spawn_item(self):
-        rand = randint(0,8)
+        rand = self.rng.randint(0,8)
         if rand == 1:
             new_crate = HealthCrate(pygame.math.Vector2(
-                randint(0, self.boundries[0]), randint(0, self.boundries[1])))
-            self.items.append(new_crate)
+                self.rng.randint(0, self.boundries[0]), self.rng.randint(0, self.boundries[1])))
         elif rand == 2:
             new_crate = BoostCrate(pygame.math.Vector2(
-                randint(0, self.boundries[0]), randint(0, self.boundries[1])))
-            self.items.append(new_crate)
+                self.rng.randint(0, self.boundries[0]), self.rng.randint(0, self.boundries[1])))
         else:
             new_crate = AmmoCrate(pygame.math.Vector2(
-                randint(0, self.boundries[0]), randint(0, self.boundries[1])))
-            self.items.append(new_crate)
+                self.rng.randint(0, self.boundries[0]), self.rng.randint(0, self.boundries[1])))
+        self.add(new_crate)
 
+    def add(self, item: Item):
+        item.handle = self.items.add(item)
 
     def destroy_crates(self):
+        # swap-remove, stale handles (already removed items) are ignored
         for c in self.destruct_items:
-            if c in self.items:
-                self.items.remove(c)
+            self.items.remove(c.handle)
         self.destruct_items = []
 
-    def draw(self, window: pygame.Surface):
+    def submit(self, queue: RenderQueue):
         for c in self.items:
-            c.draw(window)
\ No newline at end of file
+            c.submit(queue)
\ No newline at end of file
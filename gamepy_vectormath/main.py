@@ -1,66 +1,256 @@
+import argparse
+import os
 import pygame
-from projectiles import Projectile, Rocket, ProjectileCollection
-from items import ItemCollection
+import random
+import time
+from projectiles import Projectile, Rocket, TankRound, ProjectileCollection
+from items import Item, ItemCollection
 from tank import Tank, TankController
 from enemies import RocketPod
+import assets
+from assets import load_image
+from inputs import PygameInput
+from replay import InputRecorder, digest
+from render import DirtyRectRenderer, RenderQueue, ChunkedBackground
+from camera import Camera
+from text import render_text
+from perf import NullTimer, PhaseTimer, PerfOverlay
+from collision import CollisionWorld, PLAYER, ENEMY, PROJECTILE, PICKUP
+import rotation
+import memory
+
+
+# sprites rotated in every direction, their caches are built while the menu is shown
+ROTATED = ["gfx/body.png", "gfx/tower.png", "gfx/rocket_pod_tower.png", "gfx/rocket.png"]
+
+_craters = {}
+
+
+def paint_arena(surface: pygame.Surface, area: pygame.Rect):
+    """paints a part of the arena on surface. Arenas larger than arena.png repeat it."""
+    surface.fill((200, 200, 200))
+    arena = load_image("gfx/arena.png")
+    width, height = arena.get_size()
+    for x in range(area.left // width * width, area.right, width):
+        for y in range(area.top // height * height, area.bottom, height):
+            surface.blit(arena, (x - area.x, y - area.y))
+
+
+def crater(radius: int) -> pygame.Surface:
+    """scorch mark left on the arena where a projectile exploded"""
+    surface = _craters.get(radius)
+    if surface is None:
+        surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        for r, alpha in ((radius, 40), (radius * 2 // 3, 60), (radius // 3, 80)):
+            pygame.draw.circle(surface, (40, 30, 20, alpha), (radius, radius), r)
+        _craters[radius] = surface
+    return surface
 
 
 class GameSession:
-    def __init__(self, window: pygame.Surface, clock: pygame.time.Clock) -> str:
+    def __init__(self, window: pygame.Surface, clock: pygame.time.Clock, inputs: object = None, headless: bool = False,
+                 sim_rate: int = 60, fps: int = 60, render_mode: str = "dirty", seed: int = None,
+                 record: str = None, profile: bool = False, world_size: tuple = None) -> str:
         self.window = window
+        # the arena, larger than the window the camera follows the tank. Default: the window
+        self.world_size = tuple(world_size) if world_size is not None else window.get_size()
+        self.camera = Camera(window.get_size(), self.world_size)
+        # all randomness of the session comes from here, so a seed and the input replay it
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
         self.clock = clock
-        self.arena = pygame.image.load("gfx/arena.png")
+        self.inputs = inputs if inputs is not None else PygameInput()
+        if record is not None:
+            # log the input of every tick for replay.py
+            self.inputs = InputRecorder(self.inputs, record, {"seed": self.seed, "sim_rate": sim_rate,
+                                                              "world": list(self.world_size)})
+        self.headless = headless  # no rendering and no waiting for the clock
+        self.sim_rate = sim_rate
+        self.dt = 1 / sim_rate  # fixed simulation step
+        self.fps = fps  # render frame cap, 0 = uncapped
+        self.max_steps = 5  # simulation steps per frame before the loop gives up catching up
+        self.render_mode = render_mode  # "dirty" or "full" (redraw everything each frame)
+        self.background = self.build_background()
+        self.renderer = DirtyRectRenderer(self.window, self.background)
+        self.queue = RenderQueue(self.camera)  # sprites of the frame, drawn in one blits() call
+        # replaced by a PhaseTimer to measure the loop, profile keeps every frame for dump()
+        self.profile = profile
+        self.timer = PhaseTimer(history=True) if profile else NullTimer()
+        self.overlay = PerfOverlay()  # toggled with F3
         self.player = TankController(Tank())
         self.projectiles = ProjectileCollection()
+        self.projectiles.bounds = self.camera.world.inflate(200, 200)
+        self.projectiles.impacts = None if headless else []  # nobody sees the craters of a headless game
         self.enemy = RocketPod(pygame.math.Vector2(
             400, 300), self.projectiles, self.player.tank)
-        self.crates = ItemCollection()
+        self.crates = ItemCollection(rng=self.rng, size=self.world_size)
+        self.camera.follow(self.player.tank.pos)
+
+        self.world = CollisionWorld()
+        self.world.add(self.player, PLAYER, PROJECTILE | PICKUP)
+        self.world.add(self.enemy, ENEMY, PROJECTILE)
+        self.world.add_group(self.projectiles, PROJECTILE)
+        self.world.add_group(self.crates.items, PICKUP)
+        self.world.on(TankController, Rocket, TankController.get_hit)
+        self.world.on(TankController, Item, TankController.pickup_item)
+        self.world.on(RocketPod, TankRound, RocketPod.get_hit)
+
+    def memory_report(self) -> dict:
+        """memory used by the live entities (see memory.report()) and the rotation caches"""
+        result = memory.report({
+            "projectiles": self.projectiles.alive_projectiles,
+            "crates": self.crates.items,
+            "tank": [self.player.tank],
+            "enemies": [self.enemy],
+        })
+        total = result.pop("total")
+        result["projectile_arrays"] = self.projectiles.memory()
+        result["total"] = total + result["projectile_arrays"]
+        # shared by all entities, not part of the total
+        result["rotation_cache"] = rotation.report()
+        return result
+
+    def perf_counts(self) -> dict:
+        """entity counts shown by the perf overlay"""
+        return {
+            "projectiles": self.projectiles.count,
+            "rockets": int(self.projectiles.homing[:self.projectiles.count].sum()),
+            "crates": len(self.crates.items),
+        }
+
+    def toggle_overlay(self):
+        """shows or hides the perf overlay, the loop is only timed while it is shown or profiled"""
+        self.overlay.toggle()
+        if self.overlay.visible and not self.timer.enabled:
+            self.timer = PhaseTimer()
+        elif not self.overlay.visible and not self.profile:
+            self.timer = NullTimer()
 
     def run(self):
+        if self.headless:
+            while True:
+                result = self.step()
+                self.timer.end_frame()
+                if result is not None:
+                    return result
+
+        # fixed step simulation, rendering as often as the frame cap allows
+        previous = time.perf_counter()
+        lag = 0.0
         while True:
+            now = time.perf_counter()
+            lag += now - previous
+            previous = now
+
+            steps = 0
+            while lag >= self.dt:
+                result = self.step()
+                lag -= self.dt
+                steps += 1
+
+                if result is not None:
+                    self.render()
+                    self.timer.end_frame()
+                    return result
+
+                # spiral of death protection: drop the time we can't catch up with
+                if steps == self.max_steps:
+                    lag = 0.0
+                    break
+
+            self.render(lag / self.dt)
+            self.timer.end_frame()
+            self.clock.tick(self.fps)
+
+    def close(self, interrupted: bool = False):
+        """finishes the input log of a recorded session, with the digest of its final state.
+        interrupted: the last tick read its events but wasn't played (the window was closed)"""
+        if isinstance(self.inputs, InputRecorder):
+            self.inputs.close(self.inputs.ticks - interrupted, digest(self))
+
+    def step(self) -> str:
+        """simulates one fixed step. Returns "won" or "lost" when the session is over."""
+        dt = self.dt
+        with self.timer.phase("events"):
             self.events()
 
-            self.player.update()
-            self.crates.upate()
-            self.player.pickup_items(self.crates.items)
-            self.player.get_hit(self.projectiles.alive_projectiles)
-            self.enemy.get_hit(self.projectiles.alive_projectiles)
-            self.enemy.update()
-            self.projectiles.update()
-
-            self.render()
-
-            if self.player.health <= 0:
-                return "lost"
-            if self.enemy.health <= 0:
-                return "won"
-
-            self.clock.tick(60)
-
+        with self.timer.phase("update.player"):
+            self.player.update(self.camera.to_world(self.inputs.mouse_pos()), dt)
+            self.camera.follow(self.player.tank.pos)
+        with self.timer.phase("update.crates"):
+            self.crates.upate(dt)
+        with self.timer.phase("collision.world"):
+            self.world.step()
+        with self.timer.phase("update.enemy"):
+            self.enemy.update(dt)
+        with self.timer.phase("update.projectiles"):
+            self.projectiles.move(dt)
+        with self.timer.phase("collision.projectiles"):
+            self.projectiles.collide()
+        with self.timer.phase("update.decals"):
+            if self.projectiles.impacts:
+                for pos, homing in self.projectiles.impacts:
+                    self.background.stamp(crater(20 if homing else 8), pos)
+                self.projectiles.impacts.clear()
+
+        if self.player.health <= 0:
+            return "lost"
+        if self.enemy.health <= 0:
+            return "won"
+        return None
 
     def events(self):
-        for event in pygame.event.get():
+        for event in self.inputs.events():
             if event.type == pygame.QUIT:
+                self.close(interrupted=True)
                 exit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.toggle_overlay()
+                continue
             if event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
                 self.player.steer_body(event)
             if event.type == pygame.MOUSEBUTTONDOWN:
                 self.player.shoot(self.projectiles)
 
-    def render(self):
-        self.window.fill((200, 200, 200))
-        self.window.blit(self.arena, (0,0))
-
-        self.enemy.draw(self.window)
-        self.crates.draw(self.window)
-        self.projectiles.draw(self.window)
-        self.player.draw(self.window)
-
-        self.player.draw_ui(self.window)
-        self.enemy.draw_ui(self.window)
+    def build_background(self) -> ChunkedBackground:
+        """the arena floor with the craters of this session, used to restore dirty areas"""
+        return ChunkedBackground(self.world_size, paint_arena)
+
+    def render(self, alpha: float = 1.0):
+        """draws the game. alpha is how far the time is between the last two ticks."""
+        with self.timer.phase("render.clear"):
+            if self.render_mode == "full":
+                self.background.changes()  # everything is drawn anyway
+                self.background.draw(self.window, [self.window.get_rect()], self.camera.offset)
+            else:
+                self.renderer.scroll(self.camera.offset)
+                self.renderer.clear()
+
+        with self.timer.phase("render.enemy"):
+            self.enemy.submit(self.queue)
+        with self.timer.phase("render.crates"):
+            self.crates.submit(self.queue)
+        with self.timer.phase("render.projectiles"):
+            rects = self.projectiles.submit(self.queue, self.window, alpha)
+        with self.timer.phase("render.player"):
+            self.player.submit(self.queue, alpha)
+        with self.timer.phase("render.sprites"):
+            rects += self.queue.flush(self.window)
+
+        with self.timer.phase("ui.player"):
+            rects += self.player.draw_ui(self.window)
+        with self.timer.phase("ui.enemy"):
+            rects += self.enemy.draw_ui(self.window)
+        if self.overlay.visible:
+            with self.timer.phase("ui.overlay"):
+                rects += self.overlay.draw(self.window, self.timer, self.perf_counts())
 
         # pygame.draw.circle(self.window, (0, 0, 255), pygame.mouse.get_pos(), 5)
-        pygame.display.flip()
+        with self.timer.phase("render.present"):
+            if self.render_mode == "full":
+                pygame.display.flip()
+            else:
+                self.renderer.present(rects)
 
 
 class Button:
@@ -72,16 +262,16 @@ class Button:
             pygame.display.get_surface().get_width()//2, pos_y)
         self.pressed = False
 
-    def draw(self, window: pygame.Surface):
+    def draw(self, window: pygame.Surface) -> list:
         color = (10, 10, 10)
-        font = pygame.font.Font(None, 36)
-        text = font.render(self.text, True, color)
+        text = render_text(self.text, 36, color)
         offset = pygame.math.Vector2(text.get_rect().center)
 
         if self.hover:
             pygame.draw.rect(window, (100, 100, 100), self.shape)
         pygame.draw.rect(window, color, self.shape, width=2)
         window.blit(text, self.shape.center - offset)
+        return [self.shape.copy()]
 
     def update(self):
         if self.shape.collidepoint(pygame.mouse.get_pos()):
@@ -101,32 +291,92 @@ class Button:
 
 
 class Application:
-    def __init__(self) -> None:
+    def __init__(self, render_mode: str = "dirty", record: str = None, profile: str = None, world_size: tuple = None,
+                 sim_rate: int = 60, fps: int = 60, vsync: bool = False) -> None:
+        self.started = time.perf_counter()
+        self.first_frame = None  # seconds from the start to the first frame on screen
+        # the menu first, everything else is decoded while the window opens and the menu shows
+        assets.start(["gfx/menu.png"])
+        assets.start()
         pygame.init()
         self.clock = pygame.time.Clock()
-        self.window = pygame.display.set_mode((800, 600))
-        self.menu = pygame.image.load("gfx/menu.png")
-        self.lost = pygame.image.load("gfx/lost.png")
-        self.won = pygame.image.load("gfx/won.png")
+        self.window = None
+        if vsync:
+            try:
+                # vsync needs a scaled (renderer backed) window
+                self.window = pygame.display.set_mode((800, 600), pygame.SCALED, vsync=1)
+            except pygame.error:
+                pass  # not supported by this display, only the frame cap is left
+        if self.window is None:
+            self.window = pygame.display.set_mode((800, 600))
+        self.sim_rate = sim_rate  # ticks per second of every game
+        self.fps = fps  # frame cap of every game, 0 = uncapped (with vsync the display paces the frames)
+        self.world_size = world_size if world_size is not None else self.window.get_size()
+        self.warm_up_steps = self.warm_up_tasks()  # the rest of the startup work
+        self.menu = load_image("gfx/menu.png")
         self.state = "default"
         self.buttons = {
             "play": Button("Play Game", pos_y=420),
             "exit": Button("Exit", pos_y=500)
         }
+        self.render_mode = render_mode  # "dirty" or "full"
+        self.renderer = DirtyRectRenderer(self.window, self.build_background())
+        self.record = record  # folder for the input logs of all games, None = no recording
+        if record is not None:
+            os.makedirs(record, exist_ok=True)
+        self.profile = profile  # file the frame times of all games are appended to, None = no profiling
 
     def run(self):
         while True:
             self.events()
             if self.buttons["play"].update():
-                g = GameSession(self.window, self.clock)
+                log = None
+                if self.record is not None:
+                    log = os.path.join(self.record, f"{int(time.time())}.replay")
+                g = GameSession(self.window, self.clock, sim_rate=self.sim_rate, fps=self.fps,
+                                render_mode=self.render_mode, record=log, profile=self.profile is not None,
+                                world_size=self.world_size)
                 self.state = g.run()
+                g.close()
+                if self.profile is not None:
+                    g.timer.dump(self.profile)
+                self.renderer.set_background(self.build_background())
 
             if self.buttons["exit"].update():
                 exit()
 
             self.render()
+            self.warm_up()
             self.clock.tick(60)
 
+    def warm_up_tasks(self):
+        """converts the decoded images and builds the rotation caches.
+        Yields True after every piece of work and False while waiting for a decode."""
+        waiting = list(assets.IMAGES)
+        while waiting:
+            path = waiting.pop(0)
+            if not assets.decoded(path):
+                waiting.append(path)
+                yield False
+                continue
+            load_image(path)
+            yield True
+        for path in ROTATED:
+            rotation.rotation_cache(path)
+            yield True
+
+    def warm_up(self, budget: float = 0.008) -> bool:
+        """does startup work for up to budget seconds. Returns True once all of it is done.
+        Starting a game before that is fine, it just waits for what it needs."""
+        end = time.perf_counter() + budget
+        while time.perf_counter() < end:
+            progress = next(self.warm_up_steps, None)
+            if progress is None:
+                return True
+            if not progress:
+                break
+        return False
+
     def events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -135,20 +385,52 @@ class Application:
                 for i, b in self.buttons.items():
                     b.click()
 
-    def render(self):
-        self.window.fill((200, 200, 200))
+    def draw_screen(self, surface: pygame.Surface):
+        """draws the screen for the current state without the buttons"""
+        surface.fill((200, 200, 200))
         if self.state == "won":
-            self.window.blit(self.won, (0,0))
+            surface.blit(load_image("gfx/won.png"), (0,0))
         elif self.state == "lost":
-            self.window.blit(self.lost, (0,0))
+            surface.blit(load_image("gfx/lost.png"), (0,0))
         else:
-            self.window.blit(self.menu, (0,0))
+            surface.blit(self.menu, (0,0))
 
-        for i, b in self.buttons.items():
-            b.draw(self.window)
+    def build_background(self) -> pygame.Surface:
+        background = pygame.Surface(self.window.get_size()).convert()
+        self.draw_screen(background)
+        return background
 
-        pygame.display.flip()
+    def render(self):
+        if self.render_mode == "full":
+            self.draw_screen(self.window)
+        else:
+            self.renderer.clear()
 
+        rects = []
+        for i, b in self.buttons.items():
+            rects += b.draw(self.window)
 
-app = Application()
-app.run()
+        if self.render_mode == "full":
+            pygame.display.flip()
+        else:
+            self.renderer.present(rects)
+
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - self.started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--render-mode", choices=("dirty", "full"), default="dirty",
+                        help="dirty rect updates or a full redraw and flip every frame (default: dirty)")
+    parser.add_argument("--record", metavar="FOLDER", help="record the input of every game for replay.py")
+    parser.add_argument("--profile", metavar="FILE", help="append the frame times of every game to FILE (JSON lines)")
+    parser.add_argument("--world", metavar="WxH", help="arena size, larger than the window it scrolls (default: 800x600)")
+    parser.add_argument("--sim-rate", type=int, default=60, help="simulation ticks per second (default: 60)")
+    parser.add_argument("--fps", type=int, default=60, help="frame cap, 0 = uncapped (default: 60)")
+    parser.add_argument("--vsync", action="store_true", help="wait for the display refresh, use with --fps 0")
+    args = parser.parse_args()
+    world_size = tuple(int(n) for n in args.world.split("x")) if args.world else None
+    app = Application(render_mode=args.render_mode, record=args.record, profile=args.profile, world_size=world_size,
+                      sim_rate=args.sim_rate, fps=args.fps, vsync=args.vsync)
+    app.run()
@@ -1,32 +1,55 @@
 # class defing projectiles and projectile environments (collections)
 import pygame
-import math
-from helpers import angle_between_vectors
+import numpy as np
+from spatial import overlapping_pairs, segments_enter_boxes
+from helpers import REFERENCE_RATE
+from ecs import Table, Column, Entity, Component, TRANSFORM, VELOCITY, STEERING, HITBOX, LIFETIME
+import ecs
+from rotation import rotation_cache
+from render import RenderQueue, PROJECTILES
 
 import pygame.locals
 
+TRAIL_COLOR = (230, 230, 230)
+# a trail is drawn as this many polylines, each one a bit wider than the one before
+TRAIL_BUCKETS = 4
+# pixels around a rocket and its trail points that its sprite and trail may cover
+ROCKET_REACH = 40
 
-class Projectile:
-    """Base projectile that the tank can shoot."""
 
-    def __init__(self, pos: pygame.math.Vector2, heading: pygame.math.Vector2, vel: float = 10, size: int = 10) -> None:
+class Projectile(Entity):
+    """Base projectile that the tank can shoot. Projectiles are moved by their ProjectileCollection,
+    an entity of its table. Until they are added to it (and after they died) they have no table."""
+
+    # no per-instance __dict__, the components only live here while the projectile is detached
+    __slots__ = ("_pos", "_heading", "_vel", "_age", "_size", "_dead")
+
+    vel = Component()
+    age = Component()
+    size = Component()
+    dead = Component()
+
+    # age gained per tick (at the reference rate)
+    age_step = 1
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__()
+        self.reset(*args, **kwargs)
+
+    def reset(self, pos: pygame.math.Vector2, heading: pygame.math.Vector2, vel: float = 10, size: int = 10):
+        """(re)initializes the projectile. Used by __init__ and when a pooled object is reused."""
         self.pos = pos.copy()
-        self.heading = heading.copy()
+        self.heading = heading.normalize()
         self.vel = vel
         self.age = 0
         self.size = size
-        self.hitbox = pygame.Rect(0, 0, self.size, self.size)
-        self.hitbox.center = self.pos
-        self.__destroy = False
-
-    def update(self):
-        # update position and hitbox
-        self.pos = self.pos + self.heading.normalize() * self.vel
-        self.hitbox.center = self.pos
-        self.age += 1
+        self.dead = False
 
-    def draw(self, window: pygame.Surface):
-        pygame.draw.circle(window, (0, 0, 0), self.pos, self.size // 2)
+    @property
+    def hitbox(self) -> pygame.Rect:
+        hitbox = pygame.Rect(0, 0, self.size, self.size)
+        hitbox.center = self.pos
+        return hitbox
 
     def hit_something(self, hitted_object: "Projectile"):
         # Destroy the hitted object and iself.
@@ -35,17 +58,30 @@ class Projectile:
 
     # destroy setter
     def destroy(self):
-        self.__destroy = True
+        self.dead = True
 
     # destroy getter
     def get_destroy(self) -> bool:
-        return self.__destroy
+        return self.dead
+
+    def detach(self):
+        """copies the state out of the table. Called when the projectile is removed."""
+        self._pos = self.pos
+        self._heading = self.heading
+        self._vel = self.vel
+        self._age = self.age
+        self._size = self.size
+        self._dead = self.dead
+        self.table = None
+        self.slot = None
 
     def __str__(self) -> str:
         return f"projectile flying at {self.pos}"
 
 
 class TankRound(Projectile):
+    __slots__ = ()
+
     def __init__(self, pos: pygame.Vector2, heading: pygame.Vector2, vel: float = 10, size: int = 10) -> None:
         super().__init__(pos, heading, vel, size)
 
@@ -53,98 +89,305 @@ class TankRound(Projectile):
 class Rocket(Projectile):
     """Advanced Projectile that homes onto a target."""
 
+    __slots__ = ("_agility", "target")
+
+    agility = Component()
+
+    age_step = 5
+    # a new smoke trail point is added every time the age passes a multiple of this (4 ticks)
+    trail_interval = 20
+
     def __init__(self, pos: pygame.Vector2, heading: pygame.Vector2, target: object, vel: float = 3, size: int = 20, agility: float = 1.0) -> None:
-        super().__init__(pos, heading, vel, size)
+        super().__init__(pos, heading, target, vel, size, agility)
+
+    def reset(self, pos: pygame.Vector2, heading: pygame.Vector2, target: object, vel: float = 3, size: int = 20, agility: float = 1.0):
+        super().reset(pos, heading, vel, size)
         self.target = target
         self.agility = agility  # can rotate X degrees per frame
-        self.rocket = pygame.image.load("gfx/rocket.png")
-        self.smoke_trail = [self.pos.copy() for i in range(20)]
-
-    def update(self):
-        # update position and hitbox
-        self.pos = self.pos + self.heading.normalize() * self.vel
-        self.hitbox.center = self.pos
-
-        # age
-        self.age += 5
-
-        # smoke trail
-        if self.age % 4 == 0:
-            for i, s in enumerate(self.smoke_trail):
-                if i + 1 == len(self.smoke_trail):
-                    self.smoke_trail[i] = self.pos
-                else:
-                    self.smoke_trail[i] = self.smoke_trail[i+1]
-
-        # home target
-        target_direction = self.target.pos - self.pos
-        angle_CCW = angle_between_vectors(
-            self.heading, target_direction)
-
-        # steer rocket
-        if angle_CCW > 2:
-            self.heading = self.heading.rotate(self.agility)
-        if angle_CCW < -2:
-            self.heading = self.heading.rotate(-self.agility)
-
-    def draw(self, window: pygame.Surface):
-        # smoke trail
-        color = (230, 230, 230)
-        width = 1
-        for i, s in enumerate(self.smoke_trail):
-            if i == len(self.smoke_trail) - 1:
-                pygame.draw.line(window, color,
-                                 s, self.pos, width)
-            else:
-                pygame.draw.line(window, color, s,
-                                 self.smoke_trail[i+1], width)
-            width += 1
-
-        # rocket
-        angle = pygame.math.Vector2(0, -1).angle_to(self.heading)
-        rotated = pygame.transform.rotate(self.rocket, - angle)
-        offset = pygame.math.Vector2(rotated.get_rect().center)
-        window.blit(rotated, self.pos - offset)
-
-    def __str__(self) -> str:
-        return f"rocket flying at {self.pos} heading {self.heading}"
 
+    @property
+    def smoke_trail(self) -> list:
+        """trail points, oldest first. The trail lives in a ring buffer of the table."""
+        if self.table is None:
+            return [self.pos]
+        trail = self.table.columns["trail"][self.slot]
+        head = self.table.columns["trail_head"][self.slot]
+        return [pygame.math.Vector2(p) for p in np.roll(trail, -head, axis=0).tolist()]
 
-class ProjectileCollection:
-    """Projectile environment. All Projectiles must live within the same projectile collection."""
+    def detach(self):
+        self._agility = self.agility
+        super().detach()
 
-    def __init__(self) -> None:
-        self.alive_projectiles = []
-        self.destruct_projectiles = []
-        self.max_age = 3200
+    def __str__(self) -> str:
+        return f"rocket flying at {self.pos} heading {self.heading}"
 
-    def update(self):
-        for p in self.alive_projectiles:
-            p.update()
-            if p.age > self.max_age:
-                self.destruct_projectiles.append(p)
 
-            # check for collisions with other projectiles
-            collides_with = p.hitbox.collidelistall(
-                [i.hitbox for i in self.alive_projectiles])
+def draw_trail(window: pygame.Surface, points: list, first: int = 0, buckets: int = TRAIL_BUCKETS) -> list:
+    """draws a smoke trail (points oldest first) that gets wider towards the rocket. Segment i is
+    i + 1 pixels wide, neighbouring segments are drawn together as one polyline of their mean width.
+    first is the number of thin segments that were left out. Returns the areas drawn."""
+    total = first + len(points) - 1
+    chunk = -(-total // buckets)
+    dirty = []
+    start = first
+    while start < total:
+        end = min((start // chunk + 1) * chunk, total)
+        width = (start + end + 1) // 2
+        dirty.append(pygame.draw.lines(window, TRAIL_COLOR, False, points[start - first:end - first + 1], width))
+        start = end
+    return dirty
 
-            for c in collides_with:
-                # avoid self collison
-                if p != self.alive_projectiles[c]:
-                    p.hit_something(self.alive_projectiles[c])
 
-            # destroy projectile if hit
-            if p.get_destroy():
-                self.destruct_projectiles.append(p)
+class ProjectileCollection:
+    """Projectile environment. All Projectiles must live within the same projectile collection.
+    The state of every projectile is kept in an ecs.Table (one row per projectile) so the whole
+    collection moves, steers and collides in a few vectorized steps per tick."""
+
+    # full columns of the table, the first count rows belong to the alive projectiles
+    pos = Column()
+    prev_pos = Column()  # position of the previous tick, for interpolation and sweeping
+    heading = Column()
+    vel = Column()
+    age = Column()
+    age_step = Column()
+    size = Column()
+    agility = Column()
+    homing = Column()
+    target = Column()
+    dead = Column()
+    # smoke trails as ring buffers, trail_head is the index of the oldest point
+    trail = Column()
+    trail_head = Column()
+    trail_interval = Column()
+
+    def __init__(self, capacity: int = 256, trail_length: int = 20, trail_budget: int = 4000, swept: bool = True) -> None:
+        self.pool = {}  # type -> dead projectiles waiting to be reused
+        self.max_age = 3200
+        self.bounds = None  # rounds leaving this rect are removed, None = no limit
+        self.impacts = None  # list of (pos, homing) of the projectiles that hit something, None = not collected
+        self.targets = []
+        self.target_ids = {}
+        self.dots = {}
+        self.trail_length = trail_length  # points per smoke trail
+        # max. trail points drawn per frame, with more rockets the trails get shorter
+        self.trail_budget = trail_budget
+        # test the whole path of the last tick, so fast projectiles can't tunnel through things
+        self.swept = swept
+        self.table = Table(TRANSFORM, VELOCITY, STEERING, HITBOX, LIFETIME, {
+            "prev_pos": ((2,), float),
+            "homing": ((), bool),
+            "target": ((), np.int64),
+            "trail": ((trail_length, 2), float),
+            "trail_head": ((), np.int64),
+            "trail_interval": ((), float),
+        }, capacity=capacity)
+    @property
+    def alive_projectiles(self) -> tuple:
+        """the projectile objects, alive_projectiles[i].slot == i"""
+        return tuple(self.table.owners)
+
+    @property
+    def count(self) -> int:
+        return self.table.count
+
+    def memory(self) -> int:
+        """bytes of the table rows used by the live projectiles"""
+        return self.table.memory()
+
+    def add(self, p: Projectile):
+        """moves a projectile into the collection"""
+        pos = tuple(p.pos)
+        values = {"pos": pos, "prev_pos": pos, "heading": tuple(p.heading), "vel": p.vel, "age": p.age,
+                  "age_step": p.age_step, "size": p.size, "dead": p.dead}
+        if isinstance(p, Rocket):
+            values.update(agility=p.agility, homing=True, target=self.target_index(p.target), trail=pos,
+                          trail_interval=p.trail_interval)
+        # the projectile only reads the table once it belongs to the collection
+        self.table.add(p, **values)
+        p.table = self.table
+
+    def spawn(self, kind: type, pos: pygame.math.Vector2, heading: pygame.math.Vector2, *args, **kwargs) -> Projectile:
+        """adds a new projectile of the given class, reusing a dead one from the pool if possible"""
+        pool = self.pool.get(kind)
+        if pool:
+            p = pool.pop()
+            p.reset(pos, heading, *args, **kwargs)
+        else:
+            p = kind(pos, heading, *args, **kwargs)
+        self.add(p)
+        return p
+
+    def target_index(self, target: object) -> int:
+        index = self.target_ids.get(id(target))
+        if index is None:
+            index = len(self.targets)
+            self.targets.append(target)
+            self.target_ids[id(target)] = index
+        return index
+
+    def update(self, dt: float):
+        self.move(dt)
+        self.collide()
+
+    def move(self, dt: float):
+        """moves, ages and steers all projectiles"""
+        n = self.count
+        if n == 0:
+            return
+        ticks = dt * REFERENCE_RATE
+        pos = self.pos[:n]
+
+        # update position and age
+        self.prev_pos[:n] = pos
+        ecs.move(self.table, scale=ticks)
+        ecs.grow_older(self.table, self.max_age, ticks)
+        if self.bounds is not None:
+            # rounds leaving the arena never come back, rockets keep chasing their target
+            ecs.despawn_leaving(self.table, self.bounds, ~self.homing[:n])
+
+        homing = np.flatnonzero(self.homing[:n])
+        if len(homing):
+            # smoke trails, the oldest point is replaced every trail_interval of age
+            age = self.age[homing]
+            interval = self.trail_interval[homing]
+            previous_age = age - self.age_step[homing] * ticks
+            sample = homing[age // interval > previous_age // interval]
+            head = self.trail_head[sample]
+            self.trail[sample, head] = pos[sample]
+            self.trail_head[sample] = (head + 1) % self.trail_length
+
+            # home target
+            target_pos = np.array([t.pos for t in self.targets], dtype=float)
+            target_direction = target_pos[self.target[homing]] - pos[homing]
+
+            # steer rocket
+            ecs.steer_to(self.table, target_direction, homing, scale=ticks, thresholds=2, snap=False)
+
+    def collide(self):
+        """destroys projectiles hitting each other and removes everything that is dead"""
+        n = self.count
+        if n == 0:
+            return
+
+        # check for collisions with other projectiles
+        left, top = self.hitbox_corners()
+        size = self.size[:n]
+        if not self.swept:
+            a, b = overlapping_pairs(left, top, size, size, max(64, int(size.max())))
+        else:
+            # broadphase on the boxes around the path of the last tick (1 px extra for the rounding)
+            prev = self.prev_pos[:n]
+            pos = self.pos[:n]
+            half = size[:, None] / 2 + 1
+            low = np.minimum(prev, pos) - half
+            extent = np.maximum(prev, pos) + half - low
+            a, b = overlapping_pairs(low[:, 0], low[:, 1], extent[:, 0], extent[:, 1],
+                                     max(64, int(np.ceil(extent.max()))))
+
+            # hitting each other now, or on the way: a moving relative to b enters the box
+            # of both sizes around b
+            now = ((left[a] < left[b] + size[b]) & (left[b] < left[a] + size[a]) &
+                   (top[a] < top[b] + size[b]) & (top[b] < top[a] + size[a]))
+            reach = ((size[a] + size[b]) / 2)[:, None]
+            on_the_way = segments_enter_boxes(prev[a] - prev[b], (pos[a] - prev[a]) - (pos[b] - prev[b]), -reach, reach)
+            hit = now | on_the_way
+            a, b = a[hit], b[hit]
+        self.dead[a] = True
+        self.dead[b] = True
 
         self.destroy_projectiles()
 
+    def hitbox_corners(self) -> tuple:
+        """returns the top left corners of all hitboxes, placed like pygame.Rect.center would"""
+        return ecs.hitbox_corners(self.table)
+
+    def collide_rect(self, rect: pygame.Rect) -> list:
+        """returns all projectiles whose hitbox collides with rect, when swept also the ones
+        that passed through it during the last tick"""
+        n = self.count
+        if n == 0:
+            return []
+        size = self.size[:n]
+        hits = ecs.collide_rect(self.table, rect)
+        if self.swept:
+            # the center moving along its path enters the rect grown by half the size
+            start = self.prev_pos[:n]
+            half = size[:, None] / 2
+            hits |= segments_enter_boxes(start, self.pos[:n] - start,
+                                         np.array((rect.left, rect.top)) - half,
+                                         np.array((rect.right, rect.bottom)) + half)
+        owners = self.table.owners
+        return [owners[i] for i in np.flatnonzero(hits).tolist()]
+
     def destroy_projectiles(self):
-        for p in self.destruct_projectiles:
-            if p in self.alive_projectiles:
-                self.alive_projectiles.remove(p)
-        self.destruct_projectiles = []
-
-    def draw(self, window: pygame.Surface):
-        for p in self.alive_projectiles:
-            p.draw(window)
+        n = self.count
+        dead = self.dead[:n]
+        if not dead.any():
+            return
+
+        if self.impacts is not None:
+            # the ones that didn't get too old hit something, or left the arena (their craters miss the background)
+            hit = np.flatnonzero(dead & (self.age[:n] <= self.max_age))
+            self.impacts += zip(self.pos[hit].tolist(), self.homing[hit].tolist())
+
+        # the dead copy their state out before the table rows move
+        alive = self.table.owners
+        for i in np.flatnonzero(dead).tolist():
+            p = alive[i]
+            p.detach()
+            self.pool.setdefault(type(p), []).append(p)
+        self.table.remove(dead)
+
+    def trail_points(self, slots: list) -> np.ndarray:
+        """smoke trails of the given projectiles, (len(slots), trail_length, 2) oldest point first"""
+        slots = np.asarray(slots, dtype=np.int64)
+        order = (self.trail_head[slots, None] + np.arange(self.trail_length)) % self.trail_length
+        return self.trail[slots[:, None], order]
+
+    def dot(self, size: int) -> pygame.Surface:
+        """pre-drawn sprite for plain projectiles"""
+        dot = self.dots.get(size)
+        if dot is None:
+            dot = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(dot, (0, 0, 0), (size / 2, size / 2), size // 2)
+            self.dots[size] = dot
+        return dot
+
+    def submit(self, queue: RenderQueue, window: pygame.Surface, alpha: float = 1.0) -> list:
+        """queues the projectiles and rockets the camera of the queue sees. The smoke trails are
+        lines, not sprites: they are drawn on window right away, below every queued sprite.
+        Returns their areas."""
+        n = self.count
+        camera = queue.camera
+        # interpolate between the last two ticks
+        pos = self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha
+        half = self.size[:n, None] / 2
+        homing = self.homing[:n]
+        visible = camera.visible(pos - half, pos + half) if camera is not None else np.ones(n, dtype=bool)
+        offset = np.array(camera.offset if camera is not None else (0, 0), dtype=float)
+
+        dots = np.flatnonzero(visible & ~homing)
+        corners = (pos[dots] - half[dots] - offset).tolist()
+        queue.extend([(self.dot(size), corner) for corner, size in zip(corners, self.size[dots].tolist())], PROJECTILES)
+
+        rockets = np.flatnonzero(homing)
+        if len(rockets) == 0:
+            return []
+
+        # smoke trails, cut down to the newest points when there are too many
+        length = self.trail_length
+        points = np.concatenate((self.trail_points(rockets), pos[rockets, None]), axis=1)
+        if camera is not None:
+            # a rocket is drawn if the camera sees it or a part of its trail
+            seen = camera.visible(points.min(axis=1) - ROCKET_REACH, points.max(axis=1) + ROCKET_REACH)
+            rockets = rockets[seen]
+            points = points[seen]
+            if len(rockets) == 0:
+                return []
+        keep = min(length, max(2, self.trail_budget // len(rockets)))
+        points = points[:, length - keep:] - offset
+        first = length - keep
+        trails = [draw_trail(window, p, first) for p in points.tolist()]
+
+        queue.extend(ecs.rotated_sprites(self.table, rotation_cache("gfx/rocket.png"), rockets, points[:, -1]), PROJECTILES)
+        return [dirty[0].unionall(dirty[1:]) for dirty in trails]
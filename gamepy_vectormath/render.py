@@ -0,0 +1,230 @@
+# dirty rectangle rendering. Instead of redrawing and flipping the whole window,
+# only the areas that changed since the last frame are restored and updated.
+# The sprites of a frame are collected in a RenderQueue and drawn in one blits() call.
+# Large backgrounds are split into tiles (ChunkedBackground) that are built when needed.
+from collections import OrderedDict, deque
+import pygame
+
+# above this many rects a single flip is cheaper than updating every rect
+MAX_RECTS = 300
+
+# layers of the render queue, drawn from low to high
+GROUND = 0  # the rocket pod and the crates
+PROJECTILES = 1
+VEHICLES = 2  # the tank
+
+
+class DirtyRectRenderer:
+    """Keeps a cached background and the areas drawn in the previous frame.
+    Every frame those areas are restored from the background, the scene is
+    drawn on top and only the old and new areas are pushed to the display."""
+
+    def __init__(self, window: pygame.Surface, background: pygame.Surface) -> None:
+        self.window = window
+        self.background = background
+        self.previous = []
+        self.full = True  # the next frame redraws and flips everything
+        self.offset = (0, 0)  # part of the background in the window, see scroll()
+        self.changed = []  # screen areas where the background changed this frame
+        self.floor = None  # the part of a ChunkedBackground in the window
+
+    def set_background(self, background: pygame.Surface):
+        self.background = background
+        self.floor = None
+        self.invalidate()
+
+    def invalidate(self):
+        """forces a full redraw on the next frame"""
+        self.full = True
+
+    def scroll(self, offset: tuple):
+        """shows the background from offset on (a background larger than the window).
+        Everything moves then, so the next frame is redrawn in full."""
+        if offset != self.offset:
+            self.offset = offset
+            self.invalidate()
+
+    def clear(self):
+        """restores the background below everything drawn in the last frame"""
+        background, (x, y) = self.background, self.offset
+        if not isinstance(background, pygame.Surface):
+            # a ChunkedBackground: the part in the window is kept in floor, built from the
+            # visible tiles after scrolling and patched where decals changed it
+            view = pygame.Rect((x, y), self.window.get_size())
+            self.changed = [r.clip(view).move(-x, -y) for r in background.changes() if r.colliderect(view)]
+            if self.floor is None:
+                self.floor = pygame.Surface(self.window.get_size()).convert()
+                self.full = True
+            if self.full:
+                background.draw(self.floor, [self.floor.get_rect()], self.offset)
+            elif self.changed:
+                background.draw(self.floor, self.changed, self.offset)
+            background, x, y = self.floor, 0, 0
+
+        if self.full or len(self.previous) > MAX_RECTS:
+            # that many areas overlap a lot, one blit of the whole window is cheaper
+            self.window.blit(background, (0, 0), pygame.Rect((x, y), self.window.get_size()))
+        else:
+            self.window.blits([(background, r, r.move(x, y)) for r in self.previous + self.changed], doreturn=False)
+
+    def present(self, rects: list):
+        """pushes the areas drawn in this and the last frame to the display"""
+        dirty = self.previous + rects + self.changed
+        if self.full or len(dirty) > MAX_RECTS:
+            pygame.display.flip()
+            self.full = False
+        else:
+            pygame.display.update(dirty)
+        self.previous = rects
+
+
+class ChunkedBackground:
+    """A background split into square tiles of tile pixels. A tile is painted the first
+    time it is needed by paint(surface, area), area being the part of the background it
+    covers, and kept in display format (the max_tiles most recently used ones). stamp()
+    puts a decal (crater, stain) on the background and changes only the tiles below it.
+    A tile remembers its max_decals newest decals to paint them again after it left the
+    cache, older ones fade away then. The memory stays bounded however long a game runs."""
+
+    def __init__(self, size: tuple, paint: object, tile: int = 256, max_tiles: int = 64, max_decals: int = 32) -> None:
+        self.rect = pygame.Rect((0, 0), size)
+        self.paint = paint
+        self.tile = tile
+        self.max_tiles = max_tiles
+        self.max_decals = max_decals
+        self.tiles = OrderedDict()  # (column, row) -> surface, least recently used first
+        self.decals = {}  # (column, row) -> deque of (decal, top left corner), newest last
+        self.changed = []  # areas changed by stamp() since the last changes()
+        self.painted = 0  # tiles painted so far
+
+    def get_size(self) -> tuple:
+        return self.rect.size
+
+    def keys(self, area: pygame.Rect) -> list:
+        """the tiles overlapping an area of the background"""
+        area = area.clip(self.rect)
+        if not area:
+            return []
+        t = self.tile
+        return [(column, row) for row in range(area.top // t, (area.bottom - 1) // t + 1)
+                for column in range(area.left // t, (area.right - 1) // t + 1)]
+
+    def get(self, key: tuple) -> pygame.Surface:
+        """a tile, painted if it isn't cached"""
+        surface = self.tiles.get(key)
+        if surface is not None:
+            self.tiles.move_to_end(key)
+            return surface
+        area = pygame.Rect(key[0] * self.tile, key[1] * self.tile, self.tile, self.tile).clip(self.rect)
+        surface = pygame.Surface(area.size).convert()
+        self.paint(surface, area)
+        decals = self.decals.get(key)
+        if decals:
+            surface.blits([(decal, (x - area.x, y - area.y)) for decal, (x, y) in decals], doreturn=False)
+        self.painted += 1
+        self.tiles[key] = surface
+        if len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return surface
+
+    def stamp(self, decal: pygame.Surface, center: tuple):
+        """puts a decal centered on center into the tiles below it"""
+        rect = decal.get_rect(center=(round(center[0]), round(center[1])))
+        for key in self.keys(rect):
+            decals = self.decals.get(key)
+            if decals is None:
+                decals = self.decals[key] = deque(maxlen=self.max_decals)
+            decals.append((decal, rect.topleft))
+            surface = self.tiles.get(key)
+            if surface is not None:
+                surface.blit(decal, (rect.x - key[0] * self.tile, rect.y - key[1] * self.tile))
+        rect = rect.clip(self.rect)
+        if rect:
+            self.changed.append(rect)
+
+    def changes(self) -> list:
+        """the areas changed by stamp() since the last call"""
+        changed, self.changed = self.changed, []
+        return changed
+
+    def draw(self, window: pygame.Surface, areas: list, offset: tuple = (0, 0)):
+        """draws the background below the window areas, the window shows it from offset on.
+        Only the tiles below the areas are used, all parts go out in one blits() call."""
+        x, y = offset
+        t = self.tile
+        width, height = self.rect.size
+        tiles = self.tiles
+        blits = []
+        for area in areas:
+            # the area on the background, cut to its size
+            left, top = max(area.x + x, 0), max(area.y + y, 0)
+            right, bottom = min(area.right + x, width), min(area.bottom + y, height)
+            for row in range(top // t, (bottom - 1) // t + 1):
+                tile_top = row * t
+                part_top, part_bottom = max(top, tile_top), min(bottom, tile_top + t)
+                for column in range(left // t, (right - 1) // t + 1):
+                    tile_left = column * t
+                    part_left, part_right = max(left, tile_left), min(right, tile_left + t)
+                    tile = tiles.get((column, row))
+                    if tile is None:
+                        tile = self.get((column, row))
+                    else:
+                        tiles.move_to_end((column, row))
+                    blits.append((tile, (part_left - x, part_top - y),
+                                  (part_left - tile_left, part_top - tile_top, part_right - part_left, part_bottom - part_top)))
+        window.blits(blits, doreturn=False)
+
+
+class RenderQueue:
+    """Collects the sprites of a frame as (surface, dest) per layer. flush() draws them
+    sorted by layer (in the order they were added within a layer) in one blits() call.
+    With a camera, add() takes world positions and drops the sprites it can't see."""
+
+    def __init__(self, camera: object = None) -> None:
+        self.camera = camera
+        self.layers = {}  # layer -> [(surface, dest)]
+        self.offsets = {}  # surface -> (x, y) of its center
+
+    def __len__(self) -> int:
+        return sum(len(sprites) for sprites in self.layers.values())
+
+    def add(self, surface: pygame.Surface, dest: tuple, layer: int = GROUND):
+        """queues a sprite with its top left corner at dest"""
+        if self.camera is not None:
+            dest = self.camera.to_screen(dest)
+            if not self.camera.sees(dest, surface.get_size()):
+                return
+        sprites = self.layers.get(layer)
+        if sprites is None:
+            sprites = self.layers[layer] = []
+        sprites.append((surface, dest))
+
+    def extend(self, sprites: list, layer: int = GROUND):
+        """queues a list of (surface, dest), dest already in screen coordinates. For
+        collections that cull and translate their sprites themselves."""
+        if layer in self.layers:
+            self.layers[layer] += sprites
+        else:
+            self.layers[layer] = list(sprites)
+
+    def offset(self, surface: pygame.Surface) -> tuple:
+        """the center of a surface, computed once per surface"""
+        offset = self.offsets.get(surface)
+        if offset is None:
+            offset = self.offsets[surface] = surface.get_rect().center
+        return offset
+
+    def add_centered(self, surface: pygame.Surface, center: tuple, layer: int = GROUND):
+        """queues a sprite centered on center"""
+        ox, oy = self.offset(surface)
+        self.add(surface, (center[0] - ox, center[1] - oy), layer)
+
+    def flush(self, window: pygame.Surface) -> list:
+        """draws and clears the queue, returns the areas drawn"""
+        sprites = []
+        for layer in sorted(self.layers):
+            sprites += self.layers[layer]
+        self.layers.clear()
+        if not sprites:
+            return []
+        return window.blits(sprites)
@@ -0,0 +1,81 @@
+# uniform grid broadphase and swept tests for rect collisions, vectorized over numpy arrays
+import numpy as np
+
+# neighbouring cells that still need to be checked from a cell. Only half of the
+# 8 neighbours are visited so every pair of cells is looked at once.
+FORWARD_NEIGHBOURS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def overlapping_pairs(left: np.ndarray, top: np.ndarray, width: np.ndarray, height: np.ndarray, cell_size: int = 64) -> tuple:
+    """Vectorized broadphase for many small rects stored as numpy arrays.
+    No rect may be larger than cell_size. Returns the index arrays (i, j), i < j,
+    of every overlapping pair using the same rules as pygame.Rect.colliderect."""
+    empty = np.zeros(0, dtype=np.intp)
+    if len(left) < 2:
+        return empty, empty
+
+    right = left + width
+    bottom = top + height
+
+    # every rect goes into the cell of its top left corner
+    cx = left // cell_size
+    cy = top // cell_size
+    cx = cx - cx.min()
+    cy = cy - cy.min()
+    rows = int(cy.max()) + 2
+    keys = cx * rows + cy
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    everyone = np.arange(len(order))
+
+    found_i = []
+    found_j = []
+    for dx, dy in ((0, 0),) + FORWARD_NEIGHBOURS:
+        # range of sorted entries living in the neighbouring cell of each rect
+        neighbour = sorted_keys + dx * rows + dy
+        if dx == 0 and dy == 0:
+            start = everyone + 1
+        else:
+            start = np.searchsorted(sorted_keys, neighbour, "left")
+        end = np.searchsorted(sorted_keys, neighbour, "right")
+        counts = np.maximum(end - start, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+
+        # expand into candidate pairs (positions in the sorted order)
+        first = np.repeat(everyone, counts)
+        second = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+
+        a = order[first]
+        b = order[second]
+        hit = ((left[a] < right[b]) & (left[b] < right[a]) &
+               (top[a] < bottom[b]) & (top[b] < bottom[a]))
+        found_i.append(a[hit])
+        found_j.append(b[hit])
+
+    i = np.concatenate(found_i) if found_i else empty
+    j = np.concatenate(found_j) if found_j else empty
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def segments_enter_boxes(start: np.ndarray, delta: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Vectorized swept test (slab method). Returns True where the point start + t * delta,
+    0 <= t <= 1, gets strictly inside the box between low and high. Touching the border
+    does not count, like pygame.Rect.colliderect. Arguments are (n, 2) arrays or broadcast to them."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_low = (low - start) / delta
+        t_high = (high - start) / delta
+    t_enter = np.minimum(t_low, t_high)
+    t_exit = np.maximum(t_low, t_high)
+
+    # no movement along an axis: inside the slab all the time or never
+    still = delta == 0
+    inside = (low < start) & (start < high)
+    t_enter = np.where(still, np.where(inside, -np.inf, np.inf), t_enter)
+    t_exit = np.where(still, np.where(inside, np.inf, -np.inf), t_exit)
+
+    enter = np.maximum(np.maximum(t_enter[:, 0], t_enter[:, 1]), 0)
+    leave = np.minimum(np.minimum(t_exit[:, 0], t_exit[:, 1]), 1)
+    return enter < leave
@@ -0,0 +1,79 @@
+# slot based object storage with O(1) removal and generation checked handles
+
+
+class Handle:
+    """Reference to an object in a SlotStore. Turns stale once the object is removed,
+    even if its slot is reused later on."""
+
+    __slots__ = ("slot", "generation")
+
+    def __init__(self, slot: int, generation: int) -> None:
+        self.slot = slot
+        self.generation = generation
+
+    def __repr__(self) -> str:
+        return f"Handle({self.slot}, {self.generation})"
+
+
+class SlotStore:
+    """Keeps objects densely packed in a list for fast iteration. Removing an object
+    moves the last one into the hole (swap-remove), freed slots are reused from a
+    free list and every reuse bumps the slot generation."""
+
+    def __init__(self) -> None:
+        self.items = []  # dense list of objects
+        self.slot_of = []  # dense index -> slot
+        self.index_of = []  # slot -> dense index, -1 if free
+        self.generations = []  # slot -> generation
+        self.free = []
+        self.version = 0  # changes whenever an object is added or removed
+
+    def add(self, item: object) -> Handle:
+        if self.free:
+            slot = self.free.pop()
+            self.generations[slot] += 1
+        else:
+            slot = len(self.index_of)
+            self.index_of.append(-1)
+            self.generations.append(0)
+        self.index_of[slot] = len(self.items)
+        self.items.append(item)
+        self.slot_of.append(slot)
+        self.version += 1
+        return Handle(slot, self.generations[slot])
+
+    def valid(self, handle: Handle) -> bool:
+        return (handle.slot < len(self.index_of) and self.index_of[handle.slot] != -1
+                and self.generations[handle.slot] == handle.generation)
+
+    def get(self, handle: Handle) -> object:
+        """returns the object or None if the handle is stale"""
+        if not self.valid(handle):
+            return None
+        return self.items[self.index_of[handle.slot]]
+
+    def remove(self, handle: Handle) -> bool:
+        """removes the object in O(1). Returns False if the handle was stale."""
+        if not self.valid(handle):
+            return False
+        slot = handle.slot
+        index = self.index_of[slot]
+        last = len(self.items) - 1
+        if index != last:
+            # move the last object into the hole
+            self.items[index] = self.items[last]
+            moved = self.slot_of[last]
+            self.slot_of[index] = moved
+            self.index_of[moved] = index
+        self.items.pop()
+        self.slot_of.pop()
+        self.index_of[slot] = -1
+        self.free.append(slot)
+        self.version += 1
+        return True
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -1,17 +1,20 @@
 import pygame
 from projectiles import Rocket, ProjectileCollection, TankRound
-from items import AmmoCrate, HealthCrate, BoostCrate
-import math
-from helpers import angle_between_vectors
+from items import Item
+from helpers import steer_towards, REFERENCE_RATE
+from rotation import rotation_cache
+from render import RenderQueue, VEHICLES
+from text import render_text
 
 
 class Tank:
     """The tank model of the game."""
 
     def __init__(self) -> None:
-        self.body = pygame.image.load("gfx/body.png")
-        self.tower = pygame.image.load("gfx/tower.png")
+        self.body_rotations = rotation_cache("gfx/body.png")
+        self.tower_rotations = rotation_cache("gfx/tower.png")
         self.pos = pygame.math.Vector2(200, 200)
+        self.prev_pos = self.pos  # position of the previous tick, for interpolation
         self.heading_body = pygame.math.Vector2(1, 0)
         self.heading_tower = pygame.math.Vector2(1, 0)
         self.vel = 0
@@ -21,26 +24,23 @@ class Tank:
         self.hitbox = pygame.Rect(0, 0, 100, 100)
         self.hitbox.center = self.pos
 
-    def drive(self):
+    def drive(self, dt: float):
         # move tank
-        self.pos = self.pos + self.heading_body.normalize() * self.vel
+        self.prev_pos = self.pos
+        self.pos = self.pos + self.heading_body.normalize() * self.vel * dt * REFERENCE_RATE
         self.hitbox.center = self.pos
 
-    def draw(self, window: pygame.Surface):
+    def submit(self, queue: RenderQueue, alpha: float = 1.0):
+        # interpolate between the last two ticks
+        pos = self.prev_pos.lerp(self.pos, alpha)
+
         # body
-        # get the angle relative to Y- (direction of sprite drawn)
-        direction_body = pygame.math.Vector2(0, -1).angle_to(self.heading_body)
-        body = pygame.transform.rotate(self.body, - direction_body),
-        offset_b = pygame.math.Vector2(body[0].get_rect().center)
-        window.blit(body[0], self.pos - offset_b)
+        body, offset_b = self.body_rotations.get_heading(self.heading_body)
+        queue.add(body, pos - offset_b, VEHICLES)
 
         # tower
-        # get the angle relative to Y- (direction of sprite drawn)
-        direction_tower = pygame.math.Vector2(
-            0, -1).angle_to(self.heading_tower)
-        tower = pygame.transform.rotate(self.tower, - direction_tower)
-        offset_b = pygame.math.Vector2(tower.get_rect().center)
-        window.blit(tower, self.pos - offset_b)
+        tower, offset_t = self.tower_rotations.get_heading(self.heading_tower)
+        queue.add(tower, pos - offset_t, VEHICLES)
 
 
 class TankController:
@@ -52,8 +52,9 @@ class TankController:
         self.max_ammo = 20
         self.ammo = 20
         self.health = 100
-        self.boost_timer = 0
-        self.reload_timer = 0
+        self.boost_timer = 0  # seconds
+        self.reload_timer = 0  # seconds
+        self.shots = 0
 
     def steer_body(self, event):
         if event.type == pygame.KEYDOWN:
@@ -76,37 +77,30 @@ class TankController:
             if event.key == pygame.K_DOWN:
                 self.dir[1] += 1
 
-    def steer_tower(self):
-        # self.tank.heading_tower.update(pygame.mouse.get_pos())
-        target_direction = pygame.mouse.get_pos() - self.tank.pos
-        angle_CCW = angle_between_vectors(
-            self.tank.heading_tower, target_direction)
-
-        # steer rocket
-        if angle_CCW > self.tank.tower_agility:
-            self.tank.heading_tower = self.tank.heading_tower.rotate(
-                self.tank.tower_agility)
-        elif angle_CCW < -self.tank.tower_agility:
-            self.tank.heading_tower = self.tank.heading_tower.rotate(
-                -self.tank.tower_agility)
-        else:
-            self.tank.heading_tower = target_direction.normalize()
+    def steer_tower(self, aim: tuple, dt: float):
+        # turn the tower towards the aim point (mouse position)
+        target_direction = aim - self.tank.pos
+        self.tank.heading_tower = steer_towards(
+            self.tank.heading_tower, target_direction, self.tank.tower_agility * dt * REFERENCE_RATE)
 
     def shoot(self, projectiles: ProjectileCollection):
         if self.ammo > 0 and self.reload_timer == 0:
-            projectiles.alive_projectiles.append(
-                TankRound(self.tank.pos, self.tank.heading_tower))
+            projectiles.spawn(
+                TankRound, self.tank.pos, self.tank.heading_tower)
             self.ammo -= 1
-            self.reload_timer = 30
+            self.shots += 1
+            self.reload_timer = 0.5
+
+    def update(self, aim: tuple, dt: float):
+        ticks = dt * REFERENCE_RATE
 
-    def update(self):
         # reloading
         if self.reload_timer > 0:
-            self.reload_timer -= 1
+            self.reload_timer = max(0, self.reload_timer - dt)
         
         # driving
         # accelerating
-        vel_accel = 0.1
+        vel_accel = 0.1 * ticks
         if self.dir[1] != 0:
             self.tank.vel += self.dir[1] * vel_accel
         # decelerating
@@ -121,7 +115,7 @@ class TankController:
         max_vel = self.tank.max_vel
         if self.boost_timer > 0:
             max_vel += 2
-            self.boost_timer -= 1
+            self.boost_timer = max(0, self.boost_timer - dt)
 
         if self.tank.vel > max_vel:
             self.tank.vel = max_vel
@@ -129,52 +123,49 @@ class TankController:
             self.tank.vel = -max_vel
 
         # yaw rotation
-        self.tank.heading_body.rotate_ip(self.dir[0] * self.tank.agility)
-        self.tank.heading_tower.rotate_ip(self.dir[0] * self.tank.agility)
+        self.tank.heading_body.rotate_ip(self.dir[0] * self.tank.agility * ticks)
+        self.tank.heading_tower.rotate_ip(self.dir[0] * self.tank.agility * ticks)
 
         # steer tower
-        self.steer_tower()
-
-        self.tank.drive()
-
-    def pickup_items(self, items: list):
-        for i in items:
-            if self.tank.hitbox.colliderect(i.hitbox):
-                # destroy the item by calling collect()
-                i.collect()
-
-                # get the effect of the item
-                if isinstance(i, AmmoCrate):
-                    self.fill_ammo()
-                if isinstance(i, HealthCrate):
-                    self.health = 100
-                if isinstance(i, BoostCrate):
-                    self.boost_timer = 300
-
-    def get_hit(self, items: list):
-        for i in items:
-            if self.tank.hitbox.colliderect(i.hitbox):
-                # only count hits form the rocket class.
-                if isinstance(i, Rocket):
-                    print(f"got a hit from: {type(i)}")
-                    i.destroy()
-                    self.health -= 20
+        self.steer_tower(aim, dt)
+
+        self.tank.drive(dt)
+
+    @property
+    def hitbox(self) -> pygame.Rect:
+        return self.tank.hitbox
+
+    def pickup_item(self, item: Item):
+        """collision handler for crates"""
+        # destroy the item by calling collect()
+        item.collect()
+
+        # get the effect of the item
+        if item.type == "ammo":
+            self.fill_ammo()
+        if item.type == "health":
+            self.health = 100
+        if item.type == "boost":
+            self.boost_timer = 5
+
+    def get_hit(self, rocket: Rocket):
+        """collision handler for rockets, the tank's own rounds do no harm"""
+        rocket.destroy()
+        self.health -= 20
 
     def fill_ammo(self):
         self.ammo += 5
         if self.ammo > self.max_ammo:
             self.ammo = self.max_ammo
 
-    def draw(self, window):
-        self.tank.draw(window)
+    def submit(self, queue: RenderQueue, alpha: float = 1.0):
+        self.tank.submit(queue, alpha)
 
-    def draw_ui(self, window):
-        font = pygame.font.Font(None, 24)
+    def draw_ui(self, window) -> list:
         ammo_str = f"Ammo: {self.ammo}"
         if self.reload_timer > 0:
             ammo_str = ammo_str + " [reloading]"
-        ammo = font.render(ammo_str, True,  (10, 10, 10))
+        ammo = render_text(ammo_str, 24, (10, 10, 10))
         health_str = f"Health: {self.health}"
-        health = font.render(health_str, True,  (10, 10, 10))
-        window.blit(ammo, (10, 10))
-        window.blit(health, (10, 30))
+        health = render_text(health_str, 24, (10, 10, 10))
+        return [window.blit(ammo, (10, 10)), window.blit(health, (10, 30))]
@@ -0,0 +1,135 @@
+# batch runner for balancing. Plays many headless levels on a pool of processes and
+# prints one JSON line per level as soon as it is finished.
+#
+#   python batch.py --level 3 --runs 1000                         1000 runs of level 3
+#   python batch.py --set ghost_list.vel=3 --set player.max_vel=6
+#   python batch.py --sweep goal=1,3,5 --sweep ghosts=1,2 --runs 200  200 runs per combination
+#   python batch.py --policy forward --out results.jsonl           also append the results to a file
+#
+# goal and ghosts replace the values of the --level from levels.json, everything else is
+# an attribute path on the Level and is set right after it is built.
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is for the results, not the pygame banner
+import pygame as pg
+from headless import init_headless, run_headless
+from inputs import BotInput, ScriptedInput
+from levels import load_levels, set_param
+
+
+def forward(level: object, max_ticks: int) -> ScriptedInput:
+    """holds the up key for the whole run"""
+    return ScriptedInput({0: [pg.event.Event(pg.KEYDOWN, key=pg.K_UP)]})
+
+
+def bot(level: object, max_ticks: int) -> BotInput:
+    """collects the closest coin, then heads for the door"""
+    return BotInput(level)
+
+
+# name: builds the input source for a level
+POLICIES = {
+    "bot": bot,
+    "forward": forward,
+}
+
+
+def parse_value(text: str) -> object:
+    """numbers, booleans and lists as JSON, anything else stays a string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def init_worker():
+    init_headless()
+
+
+def play(job: dict) -> dict:
+    """plays one level and returns its outcome"""
+    from main import Level
+    params = dict(job["params"])
+    spec = dict(job["level"], goal=params.pop("goal"), ghosts=params.pop("ghosts"))
+    level = Level(pg.display.get_surface(), pg.time.Clock(), spec=spec, headless=True, seed=job["seed"])
+    for path, value in params.items():
+        set_param(level, path, value)
+    level.inputs = POLICIES[job["policy"]](level, job["max_ticks"])
+
+    outcome = run_headless(level, job["max_ticks"])
+    return {
+        "seed": job["seed"],
+        "policy": job["policy"],
+        "params": job["params"],
+        "result": outcome["result"] or "timeout",
+        "ticks": outcome["ticks"],
+        "score": level.score,
+        "goal": level.goal,
+        "seconds": round(outcome["seconds"], 4),
+    }
+
+
+def jobs(runs: int, params: dict, sweep: dict, policy: str, max_ticks: int, seed: int = 1, level: dict = None):
+    """one job per combination of sweep values and run, every run has its own seed"""
+    if level is None:
+        level = load_levels()[1]
+    names = list(sweep)
+    for values in itertools.product(*sweep.values()):
+        combination = dict(params, **dict(zip(names, values)))
+        for run in range(runs):
+            yield {"seed": seed + run, "policy": policy, "params": combination, "max_ticks": max_ticks, "level": level}
+
+
+def run_batch(job_list, processes: int = None):
+    """plays all jobs on a process pool and yields the outcomes in the order they finish"""
+    with multiprocessing.Pool(processes, initializer=init_worker) as pool:
+        yield from pool.imap_unordered(play, job_list)
+        # let the workers exit on their own, terminating them can hang
+        pool.close()
+        pool.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="plays many headless levels on all cores")
+    parser.add_argument("--level", type=int, default=1, help="number of the level in levels.json")
+    parser.add_argument("--runs", type=int, default=100, help="runs per parameter combination")
+    parser.add_argument("--policy", default="bot", help=f"any of {', '.join(POLICIES)}")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 3, help="a run ends as timeout after this")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first run")
+    parser.add_argument("--set", action="append", default=[], metavar="PATH=VALUE")
+    parser.add_argument("--sweep", action="append", default=[], metavar="PATH=V1,V2,...")
+    parser.add_argument("--processes", type=int, default=None, help="default: one per core")
+    parser.add_argument("--out", help="append the results to this file (JSON lines)")
+    args = parser.parse_args()
+    if args.policy not in POLICIES:
+        parser.error(f"unknown policy {args.policy}")
+    levels = load_levels()
+    if args.level not in levels:
+        parser.error(f"unknown level {args.level}")
+
+    level = levels[args.level]
+    params = {"goal": level["goal"], "ghosts": level["ghosts"]}
+    for item in args.set:
+        path, _, value = item.partition("=")
+        params[path] = parse_value(value)
+    sweep = {}
+    for item in args.sweep:
+        path, _, values = item.partition("=")
+        sweep[path] = [parse_value(v) for v in values.split(",")]
+
+    start = time.perf_counter()
+    count = 0
+    for result in run_batch(jobs(args.runs, params, sweep, args.policy, args.max_ticks, args.seed, level), args.processes):
+        count += 1
+        line = json.dumps(result)
+        print(line, flush=True)
+        if args.out:
+            with open(args.out, "a") as f:
+                f.write(line + "\n")
+    seconds = time.perf_counter() - start
+    print(f"{count} runs in {seconds:.1f} s", file=sys.stderr)
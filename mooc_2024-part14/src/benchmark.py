@@ -0,0 +1,127 @@
+# deterministic benchmarks. Builds scripted scenarios, runs them headless and
+# prints one JSON line per scenario with per-phase timings and frames per second.
+#
+#   python benchmark.py                      all scenarios
+#   python benchmark.py level8 --ticks 300   one scenario
+#   python benchmark.py --out results.jsonl  also append the results to a file
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import time
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is for the results, not the pygame banner
+import pygame as pg
+from headless import init_headless
+from inputs import ScriptedInput
+from perf import PhaseTimer
+
+
+def commit() -> str:
+    """current git commit, so results of different commits can be compared"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def zigzag_input(ticks: int) -> ScriptedInput:
+    """drives forward and turns left for a moment every second"""
+    events = {0: [pg.event.Event(pg.KEYDOWN, key=pg.K_UP)]}
+    for t in range(30, ticks, 60):
+        events[t] = [pg.event.Event(pg.KEYDOWN, key=pg.K_LEFT)]
+        events[t + 10] = [pg.event.Event(pg.KEYUP, key=pg.K_LEFT)]
+    return ScriptedInput(events)
+
+
+def level(window: pg.Surface, ticks: int, goal: int, ghosts: int, seed: int):
+    from main import Level
+    g = Level(window, pg.time.Clock(), goal=goal, ghosts=ghosts,
+              inputs=zigzag_input(ticks), headless=True, seed=seed)
+    return g
+
+
+def level8(window: pg.Surface, ticks: int, size: int, seed: int):
+    """the existing level 8: 100 coins and 100 ghosts"""
+    from levels import load_levels
+    spec = load_levels()[8]
+    return level(window, ticks, spec["goal"], spec["ghosts"], seed)
+
+
+def ghosts(window: pg.Surface, ticks: int, size: int, seed: int):
+    """size ghosts chasing the robot"""
+    return level(window, ticks, 3, size, seed)
+
+
+# name: (scenario, default size)
+SCENARIOS = {
+    "level8": (level8, 0),
+    "ghosts": (ghosts, 1000),
+}
+
+
+def run(name: str, ticks: int = 600, size: int = None, seed: int = 1, render: bool = True,
+        render_mode: str = "dirty") -> dict:
+    scenario, default_size = SCENARIOS[name]
+    if size is None:
+        size = default_size
+    window = pg.display.get_surface()
+    random.seed(seed)
+    g = scenario(window, ticks, size, seed)
+    g.render_mode = render_mode  # "dirty" or "full"
+    timer = PhaseTimer(window=ticks)
+    g.timer = timer
+
+    # the outcome of step() is ignored, the level keeps running after the robot got caught
+    collections = sum(s["collections"] for s in gc.get_stats())
+    start = time.perf_counter()
+    for tick in range(ticks):
+        g.step()
+        if render:
+            g.render()
+        timer.end_frame()
+    seconds = time.perf_counter() - start
+    collections = sum(s["collections"] for s in gc.get_stats()) - collections
+
+    return {
+        "sketch": "mooc_2024-part14",
+        "scenario": name,
+        "commit": commit(),
+        "seed": seed,
+        "size": size,
+        "render_mode": render_mode,
+        "ticks": ticks,
+        "seconds": round(seconds, 4),
+        "fps": round(ticks / seconds, 1),
+        "ms_per_frame": {phase: round(ms, 4) for phase, ms in timer.report(ticks).items()},
+        "frame_ms": {name: round(ms, 4) for name, ms in timer.percentiles().items()},
+        "gc_collections": collections,
+        "memory": g.memory_report(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="runs the benchmark scenarios headless")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--size", type=int, default=None, help="scenario size, e.g. number of ghosts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-render", action="store_true")
+    parser.add_argument("--render-mode", choices=("dirty", "full"), default="dirty",
+                        help="dirty rect updates or a full redraw and flip every frame (default: dirty)")
+    parser.add_argument("--out", help="append the results to this file (JSON lines)")
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    init_headless()
+    for name in args.scenarios or SCENARIOS:
+        result = run(name, args.ticks, args.size, args.seed, not args.no_render, args.render_mode)
+        line = json.dumps(result)
+        print(line)
+        if args.out:
+            with open(args.out, "a") as f:
+                f.write(line + "\n")
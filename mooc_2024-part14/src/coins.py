@@ -0,0 +1,76 @@
+# coins of a level. All coins are rows of one ecs.Table and are collided and drawn
+# together, a Coin is only a view on its row for the collision handlers and the bot.
+import numpy as np
+import pygame as pg
+import ecs
+from ecs import Table, Column, Entity, Component, TRANSFORM, LIFETIME
+from assets import load_image
+
+
+class Coin(Entity):
+    """The Coins that need to be collected. One coin of a CoinField."""
+    __slots__ = ("field",)
+
+    dead = Component()  # collected, removed at the end of the tick
+
+    def __init__(self, field: "CoinField") -> None:
+        super().__init__(field.table)
+        self.field = field
+
+    @property
+    def hitbox(self) -> pg.Rect:
+        rect = pg.Rect(0, 0, self.field.size, self.field.size)
+        rect.center = self.pos
+        return rect
+
+    def destroy(self):
+        """Marks the coin as collected. Called by the collision handler."""
+        self.dead = True
+
+
+class CoinField:
+    """All coins of a level. Indexed collision group: answers collide_rect() with one
+    numpy test over all coins."""
+
+    pos = Column()
+    dead = Column()
+
+    def __init__(self, graphic: str = "coin.png", size: int = 40, capacity: int = 64) -> None:
+        self.graphic = load_image(graphic)
+        self.size = size  # hitbox width and height
+        self.table = Table({"pos": TRANSFORM["pos"], "dead": LIFETIME["dead"]}, capacity=capacity)
+        self.members = self.table.owners  # Coin views, members[i].slot == i
+
+    @property
+    def count(self) -> int:
+        return self.table.count
+
+    def memory(self) -> int:
+        """bytes of the table rows used by the coins"""
+        return self.table.memory()
+
+    def spawn(self, pos: pg.Vector2) -> Coin:
+        coin = Coin(self)
+        self.table.add(coin, pos=tuple(pos))
+        return coin
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def collide_rect(self, rect: pg.Rect) -> list:
+        """returns the coins not collected yet whose hitbox collides with rect"""
+        hit = ecs.collide_rect(self.table, rect, size=self.size) & ~self.dead[:self.count]
+        return [self.members[i] for i in np.flatnonzero(hit).tolist()]
+
+    def remove_collected(self):
+        self.table.remove(self.dead[:self.count])
+
+    def draw(self, window: pg.Surface) -> list:
+        """draws all coins centered on their position in one blits() call"""
+        if self.count == 0:
+            return []
+        corners = (self.pos[:self.count] - self.graphic.get_rect().center).tolist()
+        return window.blits([(self.graphic, corner) for corner in corners])
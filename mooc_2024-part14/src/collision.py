@@ -0,0 +1,129 @@
+# collision world: all collidable entities sorted into layers. Every tick it finds the
+# colliding pairs once and hands them to the handler registered for the two types.
+
+# layers (bit flags). An entity collides with the layers in its mask.
+PLAYER = 1
+ENEMY = 2
+PROJECTILE = 4
+PICKUP = 8
+EXIT = 16
+
+
+class Group:
+    """Entities sharing a layer and a mask. Either a plain collection of objects with a hitbox
+    or an indexed collection that answers collide_rect() itself (e.g. ProjectileCollection)."""
+
+    def __init__(self, entities: object, layer: int, mask: int = 0) -> None:
+        self.entities = entities
+        self.layer = layer
+        self.mask = mask
+        self.indexed = hasattr(entities, "collide_rect")
+        self.version = None  # version of the entities the cached hitboxes belong to
+        self.members = []
+        self.hitboxes = []
+
+    def refresh(self):
+        """collects the members and their hitboxes. Collections with a version counter
+        (SlotStore) are only collected again after they changed. Hitboxes are updated in
+        place by their owners, so the cached rects stay valid."""
+        version = getattr(self.entities, "version", None)
+        if version is not None and version == self.version:
+            return
+        self.version = version
+        self.members = list(self.entities)
+        self.hitboxes = [e.hitbox for e in self.members]
+
+    def query(self, rect) -> list:
+        """returns all members colliding with rect. Plain groups test every member."""
+        if self.indexed:
+            return self.entities.collide_rect(rect)
+        return [self.members[i] for i in rect.collidelistall(self.hitboxes)]
+
+
+class CollisionWorld:
+    """Knows every collidable group. Only members of groups with a mask go looking for
+    collisions, each of them tests a group in one call: an indexed group answers with one
+    numpy test over its arrays (collide_rect), a plain group is scanned rect by rect in C
+    (collidelistall), which grows with its size. Large groups (projectiles, ghosts, coins)
+    are indexed."""
+
+    def __init__(self) -> None:
+        self.groups = []
+        self.handlers = {}  # (type, type) -> handler
+        self.resolved = {}  # (type, type) of a pair -> (handler, swapped), filled on demand
+
+    def add(self, entity: object, layer: int, mask: int = 0) -> Group:
+        """adds a single entity"""
+        return self.add_group([entity], layer, mask)
+
+    def add_group(self, entities: object, layer: int, mask: int = 0) -> Group:
+        """adds a live collection of entities, it is read again every tick"""
+        group = Group(entities, layer, mask)
+        self.groups.append(group)
+        return group
+
+    def on(self, type_a: type, type_b: type, handler):
+        """registers handler(a, b) for collisions between instances of type_a and type_b"""
+        self.handlers[(type_a, type_b)] = handler
+        self.resolved.clear()
+
+    def handler(self, a: object, b: object) -> tuple:
+        """returns (handler, swapped) for the pair or (None, False). Subclasses use the
+        handler of their base classes."""
+        key = (type(a), type(b))
+        found = self.resolved.get(key)
+        if found is None:
+            found = (None, False)
+            for cls_a in key[0].__mro__:
+                for cls_b in key[1].__mro__:
+                    if (cls_a, cls_b) in self.handlers:
+                        found = (self.handlers[(cls_a, cls_b)], False)
+                    elif (cls_b, cls_a) in self.handlers:
+                        found = (self.handlers[(cls_b, cls_a)], True)
+                    else:
+                        continue
+                    break
+                if found[0] is not None:
+                    break
+            self.resolved[key] = found
+        return found
+
+    def pairs(self) -> list:
+        """returns every colliding pair (a, b) of groups whose masks match, each pair once"""
+        for group in self.groups:
+            if not group.indexed:
+                group.refresh()
+
+        result = []
+        for i, group in enumerate(self.groups):
+            if not group.mask or group.indexed:
+                continue
+            for j, other in enumerate(self.groups):
+                if not group.mask & other.layer:
+                    continue
+                # pairs between two searching groups are only looked for once
+                if other.mask & group.layer and not other.indexed and j < i:
+                    continue
+                if other is group:
+                    # collisions inside a group, (a, b) but not (b, a)
+                    for k, rect in enumerate(group.hitboxes):
+                        result += [(group.members[k], group.members[m])
+                                   for m in rect.collidelistall(group.hitboxes) if m > k]
+                    continue
+                for a, rect in zip(group.members, group.hitboxes):
+                    result += [(a, b) for b in other.query(rect)]
+        return result
+
+    def step(self) -> int:
+        """finds all collisions and calls their handlers. Returns the number of pairs handled."""
+        handled = 0
+        for a, b in self.pairs():
+            handler, swapped = self.handler(a, b)
+            if handler is None:
+                continue
+            if swapped:
+                handler(b, a)
+            else:
+                handler(a, b)
+            handled += 1
+        return handled
@@ -0,0 +1,237 @@
+# entity component core, the same file in both sketches. Entities of one kind live in a
+# Table: every component is a numpy column with one row per entity and the rows stay
+# packed. Systems are plain functions that process all rows of a table in one call, so
+# the per entity work happens inside numpy instead of one Python call per object.
+import numpy as np
+import pygame
+from helpers import steer
+
+# components: column name -> (shape of one value, dtype)
+TRANSFORM = {"pos": ((2,), float), "heading": ((2,), float)}
+VELOCITY = {"vel": ((), float)}
+STEERING = {"agility": ((), float)}
+HITBOX = {"size": ((), np.int64)}  # side of a square hitbox around pos
+LIFETIME = {"age": ((), float), "age_step": ((), np.int64), "dead": ((), bool)}
+
+
+class Table:
+    """Packed storage for entities with the same components. The columns have room for
+    capacity rows, the first count rows are alive. owners[i] is the object of row i (or
+    None), remove() keeps its slot attribute pointing at its row."""
+
+    def __init__(self, *components: dict, capacity: int = 64) -> None:
+        self.layout = {}
+        for component in components:
+            self.layout.update(component)
+        self.count = 0
+        self.owners = []
+        self.columns = {}
+        self.allocate(capacity)
+
+    def allocate(self, capacity: int):
+        """(re)allocates the columns and keeps the current content"""
+        old = self.columns
+        self.capacity = capacity
+        self.columns = {name: np.zeros((capacity,) + shape, dtype=dtype)
+                        for name, (shape, dtype) in self.layout.items()}
+        for name, values in old.items():
+            self.columns[name][:self.count] = values[:self.count]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """the column of the alive rows"""
+        return self.columns[name][:self.count]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, owner: object = None, **values) -> int:
+        """appends a row, components that aren't given are zero. Returns the row."""
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        row = self.count
+        for name, column in self.columns.items():
+            column[row] = values.get(name, 0)
+        self.owners.append(owner)
+        if owner is not None:
+            owner.slot = row
+        self.count += 1
+        return row
+
+    def remove(self, dead: np.ndarray) -> list:
+        """removes the rows where dead (one bool per alive row) is True and returns their
+        owners. Survivors from the tail move into the holes, so only as many rows move as
+        were removed."""
+        n = self.count
+        if not dead.any():
+            return []
+        owners = self.owners
+        removed = [owners[i] for i in np.flatnonzero(dead).tolist()]
+
+        m = n - int(dead.sum())
+        holes = np.flatnonzero(dead[:m])
+        movers = m + np.flatnonzero(~dead[m:])
+        for values in self.columns.values():
+            values[holes] = values[movers]
+
+        for hole, mover in zip(holes.tolist(), movers.tolist()):
+            owner = owners[mover]
+            owners[hole] = owner
+            if owner is not None:
+                owner.slot = hole
+        del owners[m:]
+        self.count = m
+        return removed
+
+    def memory(self) -> int:
+        """bytes of the rows used by the alive entities"""
+        row = sum(values.nbytes for values in self.columns.values()) // self.capacity
+        return row * self.count
+
+
+class Column:
+    """Attribute of a class owning a table (self.table), returns the whole column array."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.table.columns[self.name]
+
+
+class Component:
+    """Attribute of an Entity, reads and writes the entity's row of a column. While the
+    entity has no table the value lives in the attribute _<name> (needs a slot)."""
+
+    def __init__(self, vector: bool = False) -> None:
+        self.vector = vector
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.detached = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if obj.table is None:
+            return getattr(obj, self.detached)
+        value = obj.table.columns[self.name][obj.slot]
+        if self.vector:
+            return pygame.math.Vector2(value.tolist())
+        return value.item()
+
+    def __set__(self, obj, value):
+        if obj.table is None:
+            setattr(obj, self.detached, pygame.math.Vector2(value) if self.vector else value)
+            return
+        obj.table.columns[self.name][obj.slot] = tuple(value) if self.vector else value
+
+
+class Entity:
+    """View on one row of a table, for code that deals with single entities (collision
+    handlers, input bots, tests)."""
+    __slots__ = ("table", "slot")
+
+    pos = Component(vector=True)
+    heading = Component(vector=True)
+
+    def __init__(self, table: Table = None) -> None:
+        self.table = table  # None for a detached entity
+        self.slot = None  # set by Table.add()
+
+
+# systems
+
+def move(table: Table, vel=None, scale: float = 1.0, normalize: bool = False):
+    """moves every entity along its heading by its vel (or the given speed for all).
+    normalize for headings that aren't unit vectors."""
+    n = table.count
+    heading = table.columns["heading"][:n]
+    if normalize:
+        length = np.hypot(heading[:, 0], heading[:, 1])
+        heading = heading / np.maximum(length, 1e-9)[:, None]
+    if vel is None:
+        vel = table.columns["vel"][:n, None]
+    table.columns["pos"][:n] += heading * vel * scale
+
+
+def grow_older(table: Table, max_age: float, scale: float = 1.0):
+    """adds age_step to every age and marks the entities older than max_age as dead"""
+    n = table.count
+    age = table.columns["age"][:n]
+    age += table.columns["age_step"][:n] * scale
+    table.columns["dead"][:n] |= age > max_age
+
+
+def despawn_leaving(table: Table, bounds: pygame.Rect, where: np.ndarray = None):
+    """marks the entities (where True, default all) that are outside bounds and heading
+    away from it as dead. For entities flying straight, they can't come back."""
+    n = table.count
+    x, y = table.columns["pos"][:n].T
+    hx, hy = table.columns["heading"][:n].T
+    leaving = (((x < bounds.left) & (hx <= 0)) | ((x >= bounds.right) & (hx >= 0))
+               | ((y < bounds.top) & (hy <= 0)) | ((y >= bounds.bottom) & (hy >= 0)))
+    if where is not None:
+        leaving &= where
+    table.columns["dead"][:n] |= leaving
+
+
+def steer_to(table: Table, directions: np.ndarray, rows: np.ndarray = None, agility=None, scale: float = 1.0,
+             thresholds=None, snap: bool = True):
+    """turns the headings (of rows, default all) towards the directions by their agility
+    (or the given one for all), see helpers.steer()"""
+    if rows is None:
+        rows = slice(0, table.count)
+    if agility is None:
+        agility = table.columns["agility"][rows]
+    heading = table.columns["heading"]
+    heading[rows] = steer(heading[rows], directions, agility * scale, thresholds, snap)
+
+
+def pixel_round(values: np.ndarray) -> np.ndarray:
+    """rounds like pygame.Rect does when a float position is assigned (half away from zero)"""
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+
+def hitbox_corners(table: Table, size=None) -> tuple:
+    """top left corners of all hitboxes, placed like pygame.Rect.center would"""
+    n = table.count
+    if size is None:
+        size = table.columns["size"][:n]
+    center = pixel_round(table.columns["pos"][:n])
+    half = size // 2
+    return center[:, 0] - half, center[:, 1] - half
+
+
+def collide_rect(table: Table, rect: pygame.Rect, size=None) -> np.ndarray:
+    """True for every entity whose hitbox collides with rect"""
+    if size is None:
+        size = table.columns["size"][:table.count]
+    left, top = hitbox_corners(table, size)
+    return (left < rect.right) & (rect.left < left + size) & (top < rect.bottom) & (rect.top < top + size)
+
+
+def rotated_sprites(table: Table, rotations: object, rows: np.ndarray = None, pos: np.ndarray = None) -> list:
+    """(surface, dest) of the rows (default all) with the sprite of a RotationCache turned
+    along their heading, centered on pos (default their position)"""
+    if rows is None:
+        rows = np.arange(table.count)
+    if pos is None:
+        pos = table.columns["pos"][rows]
+    heading = table.columns["heading"][rows]
+    # same bucket as RotationCache.get_heading(): angle clockwise from Y-
+    angle = np.degrees(np.arctan2(heading[:, 1], heading[:, 0])) + 90
+    buckets = (np.rint(angle / rotations.step) % rotations.buckets).astype(np.intp)
+    frames = rotations.frames
+    sprites = []
+    for b, (x, y) in zip(buckets.tolist(), pos.tolist()):
+        surface, offset = frames[b]
+        sprites.append((surface, (x - offset.x, y - offset.y)))
+    return sprites
+
+
+def draw_rotated(window: pygame.Surface, table: Table, rotations: object, rows: np.ndarray = None,
+                 pos: np.ndarray = None) -> list:
+    """draws rotated_sprites() in one blits() call"""
+    return window.blits(rotated_sprites(table, rotations, rows, pos))
@@ -0,0 +1,51 @@
+# headless simulation. Runs levels without a window (SDL dummy video driver),
+# without rendering and without waiting for the clock.
+import json
+import os
+import sys
+import time
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is for the results, not the pygame banner
+import pygame as pg
+from assets import preload
+
+
+def init_headless(size: tuple = (800, 600)) -> pg.Surface:
+    """starts pygame on the dummy video driver and returns the (invisible) window"""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pg.init()
+    window = pg.display.set_mode(size)
+    preload()
+    return window
+
+
+def run_headless(level: object, max_ticks: int = None) -> dict:
+    """steps a level as fast as possible until it ends or max_ticks are reached"""
+    ticks = 0
+    result = None
+    start = time.perf_counter()
+    while result is None and (max_ticks is None or ticks < max_ticks):
+        result = level.step()
+        ticks += 1
+    seconds = time.perf_counter() - start
+    return {
+        "result": result,
+        "ticks": ticks,
+        "seconds": seconds,
+        "tps": ticks / seconds if seconds > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    from inputs import ScriptedInput
+    from main import Level
+    from levels import load_levels
+
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+    window = init_headless()
+    # hold the up key for the whole run
+    script = {0: [pg.event.Event(pg.KEYDOWN, key=pg.K_UP)]}
+    g = Level(window, pg.time.Clock(), spec=load_levels()[level],
+              inputs=ScriptedInput(script), headless=True)
+    print(json.dumps(run_headless(g, ticks)))
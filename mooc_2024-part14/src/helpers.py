@@ -0,0 +1,42 @@
+# vector helpers shared by the game objects
+import numpy as np
+from pygame import Vector2
+
+
+def steer(headings: np.ndarray, targets: np.ndarray, agilities, thresholds=None, snap: bool = True) -> np.ndarray:
+    """Batched homing kernel. headings and targets (target directions) are (n, 2) arrays.
+    Turns every heading by its agility (degrees) towards its target. Headings that are
+    within the threshold (default: the agility) are snapped onto the normalized target,
+    or left alone if snap is False. Uses the cross and dot product only, no acos."""
+    agilities = np.asarray(agilities, dtype=float)
+    thresholds = agilities if thresholds is None else np.asarray(thresholds, dtype=float)
+    hx, hy = headings[:, 0], headings[:, 1]
+    tx, ty = targets[:, 0], targets[:, 1]
+    cross = hx * ty - hy * tx
+    dot = hx * tx + hy * ty
+
+    # the sign of sin(angle - threshold) tells if the target is further away than the threshold
+    t = np.radians(thresholds)
+    cos_t = np.cos(t)
+    sin_t = np.sin(t)
+    left = (cross >= 0) & (cross * cos_t - dot * sin_t > 0)
+    right = (cross < 0) & (-cross * cos_t - dot * sin_t > 0)
+
+    turn = np.radians(np.where(left, agilities, np.where(right, -agilities, 0.0)))
+    c = np.cos(turn)
+    s = np.sin(turn)
+    result = np.stack((hx * c - hy * s, hx * s + hy * c), axis=1)
+
+    if snap:
+        length = np.hypot(tx, ty)
+        on_target = ~(left | right) & (length > 0)
+        result[on_target] = targets[on_target] / length[on_target, None]
+
+    return result
+
+
+def steer_towards(heading: Vector2, target_direction: Vector2, agility: float, threshold: float = None, snap: bool = True) -> Vector2:
+    """single object version of steer()"""
+    result = steer(np.array([heading], dtype=float), np.array([target_direction], dtype=float),
+                   agility, threshold, snap)
+    return Vector2(result[0, 0], result[0, 1])
@@ -0,0 +1,77 @@
+# input sources. The game reads events and the mouse through one of these so the
+# simulation can also be driven by a script instead of a real player.
+import pygame as pg
+
+
+class PygameInput:
+    """Reads the input of the player from pygame."""
+
+    def events(self) -> list:
+        return pg.event.get()
+
+    def mouse_pos(self) -> tuple:
+        return pg.mouse.get_pos()
+
+
+class ScriptedInput:
+    """Plays back prepared input. events maps a tick to a list of pygame events,
+    mouse maps a tick to a mouse position that stays until the next entry."""
+
+    def __init__(self, events: dict = None, mouse: dict = None, start_mouse: tuple = (0, 0)) -> None:
+        self.script = events if events is not None else {}
+        self.mouse = mouse if mouse is not None else {}
+        self.tick = -1
+        self.pos = start_mouse
+
+    def events(self) -> list:
+        # called once per tick, so it advances the script
+        self.tick += 1
+        self.pos = self.mouse.get(self.tick, self.pos)
+        return self.script.get(self.tick, [])
+
+    def mouse_pos(self) -> tuple:
+        return self.pos
+
+
+class BotInput:
+    """Simple computer player: keeps driving and turns towards the closest coin, or to the
+    door once all coins are collected. Reads the state of its level."""
+
+    def __init__(self, level: object = None, tolerance: float = 5) -> None:
+        self.level = level
+        self.tolerance = tolerance  # degrees the robot may be off before it turns
+        self.tick = -1
+        self.turn = 0
+
+    def target(self) -> pg.Vector2:
+        level = self.level
+        pos = level.player.pos
+        coins = [c for c in level.coins_list if not c.dead]
+        if not coins:
+            return level.door.pos
+        return min(coins, key=lambda c: pos.distance_squared_to(c.pos)).pos
+
+    def events(self) -> list:
+        self.tick += 1
+        events = []
+        if self.tick == 0:
+            events.append(pg.event.Event(pg.KEYDOWN, key=pg.K_UP))
+
+        robot = self.level.player
+        angle = (robot.heading.angle_to(self.target() - robot.pos) + 180) % 360 - 180
+        turn = 0
+        if angle > self.tolerance:
+            turn = 1
+        elif angle < -self.tolerance:
+            turn = -1
+        if turn != self.turn:
+            keys = {-1: pg.K_LEFT, 1: pg.K_RIGHT}
+            if self.turn:
+                events.append(pg.event.Event(pg.KEYUP, key=keys[self.turn]))
+            if turn:
+                events.append(pg.event.Event(pg.KEYDOWN, key=keys[turn]))
+            self.turn = turn
+        return events
+
+    def mouse_pos(self) -> tuple:
+        return (0, 0)
@@ -0,0 +1,122 @@
+# data driven levels. levels.json lists every level with its layout, spawn waves and
+# parameters. A LevelPlan holds the object tables of a level (positions drawn from the level
+# seed). LevelLoader builds the plans of the coming levels on a background thread and has their
+# sprite files decoded while a level is played. Surfaces are only converted and rotated on the
+# main thread, when the Level is built.
+#
+# A level in levels.json, every key is optional:
+#   {
+#     "goal": 3,                          coins to collect, random positions unless listed in "coins"
+#     "ghosts": 1,                        ghosts at the start
+#     "coins": [[400, 300]],              fixed coin positions
+#     "door": [700, 100],                 fixed door position (default: random)
+#     "robot": [20, 500],                 start position of the robot
+#     "waves": [{"tick": 600, "ghosts": 5}],  ghosts joining later on
+#     "sprites": {"ghost": "monster.png", "coin": "coin.png", "door": "door.png"},
+#     "params": {"ghost_list.vel": 5}     attribute paths set on the Level after it is built
+#   }
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from pygame import Vector2
+import assets
+from assets import BASE_DIR
+
+LEVELS_FILE = os.path.join(BASE_DIR, "levels.json")
+
+DEFAULTS = {
+    "goal": 3,
+    "ghosts": 1,
+    "coins": [],
+    "door": None,
+    "robot": [20, 500],
+    "waves": [],
+    "sprites": {"ghost": "monster.png", "coin": "coin.png", "door": "door.png"},
+    "params": {},
+}
+
+
+def level_spec(data: dict) -> dict:
+    """fills in the defaults of a level"""
+    spec = dict(DEFAULTS, **data)
+    spec["sprites"] = dict(DEFAULTS["sprites"], **spec["sprites"])
+    if len(spec["coins"]) > spec["goal"]:
+        raise ValueError(f"level has {len(spec['coins'])} fixed coins but a goal of {spec['goal']}")
+    return spec
+
+
+def load_levels(path: str = LEVELS_FILE) -> dict:
+    """returns {number: spec}, levels are numbered from 1 in file order"""
+    with open(path) as f:
+        return {i: level_spec(data) for i, data in enumerate(json.load(f), 1)}
+
+
+def set_param(obj: object, path: str, value: object):
+    """sets a dotted attribute path like "player.max_vel". A list on the way applies
+    the rest of the path to every element."""
+    name, _, rest = path.partition(".")
+    if isinstance(obj, list):
+        for item in obj:
+            set_param(item, path, value)
+    elif rest:
+        set_param(getattr(obj, name), rest, value)
+    else:
+        setattr(obj, name, value)
+
+
+class LevelPlan:
+    """The object tables of one level: where everything starts and which ghosts come when.
+    Draws all random positions from the level seed, in the order the level used to."""
+
+    def __init__(self, spec: dict, size: tuple, seed: int = None) -> None:
+        self.spec = spec
+        self.size = size  # window size
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)  # handed over to the level
+        self.door = Vector2(spec["door"]) if spec["door"] is not None else Vector2(self.random_location())
+        self.robot = Vector2(spec["robot"])
+        self.coins = [Vector2(pos) for pos in spec["coins"]]
+        self.coins += [Vector2(self.random_location()) for i in range(spec["goal"] - len(self.coins))]
+        self.ghosts = self.random_ghosts(spec["ghosts"])
+        # [(tick, [(pos, heading)])]
+        self.waves = [(wave["tick"], self.random_ghosts(wave["ghosts"]))
+                      for wave in sorted(spec["waves"], key=lambda wave: wave["tick"])]
+
+    def random_location(self, margin: int = 50) -> tuple:
+        """returns a random location (tuple) with a safety margin"""
+        return (self.rng.randint(margin, self.size[0] - margin), self.rng.randint(margin, self.size[1] - margin))
+
+    def random_ghosts(self, amount: int) -> list:
+        """(pos, heading) of ghosts in random places, flying in random directions"""
+        ghosts = []
+        for i in range(amount):
+            pos = Vector2(self.random_location(200))
+            ghosts.append((pos, Vector2(0, -1).rotate(self.rng.randint(0, 359))))
+        return ghosts
+
+
+class LevelLoader:
+    """Prepares levels on a background thread so starting one doesn't stall the game.
+    A plan is used for one run of a level, prefetch() again to have the next one ready."""
+
+    def __init__(self, levels: dict, size: tuple) -> None:
+        self.levels = levels
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = {}  # level number -> future of its plan
+
+    def prefetch(self, number: int):
+        """starts preparing a level unless it is already on its way"""
+        if number in self.levels and number not in self.pending:
+            spec = self.levels[number]
+            assets.start(list(spec["sprites"].values()))
+            self.pending[number] = self.executor.submit(LevelPlan, spec, self.size)
+
+    def get(self, number: int) -> LevelPlan:
+        """the plan of a level, waits for it if it is still being prepared"""
+        self.prefetch(number)
+        return self.pending.pop(number).result()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
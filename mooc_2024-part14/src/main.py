@@ -1,25 +1,39 @@
 # Complete your game here
+import argparse
+import os
+import time
 import pygame as pg
 from pygame import Vector2
-from random import randint
-import math
+from inputs import PygameInput
+from replay import InputRecorder, digest
+from render import DirtyRectRenderer
+from text import render_text
+from perf import NullTimer, PhaseTimer, PerfOverlay
+from assets import load_image, preload
+from swarm import Ghost, GhostSwarm
+from coins import Coin, CoinField
+from levels import LevelLoader, LevelPlan, level_spec, load_levels, set_param
+from collision import CollisionWorld, PLAYER, ENEMY, PICKUP, EXIT
+import rotation
+import memory
 
 
 class GameObject:
     """Base class for objects including position, a hitbox and draw function"""
+    __slots__ = ("graphic", "pos", "hitbox", "heading", "is_destroyed")
 
     def __init__(self, graphic: str, pos: Vector2, size: int = 100, height: int = 100) -> None:
-        self.graphic = pg.image.load(graphic)
+        self.graphic = load_image(graphic)
         self.pos = pos.copy()
         self.hitbox = pg.Rect(0, 0, size, height)
         self.hitbox.center = self.pos
         self.heading = Vector2(0, -1)  # pointing upwards by default
         self.is_destroyed = False
 
-    def draw(self, window: pg.Surface):
-        """draws the graphic at the object center"""
+    def draw(self, window: pg.Surface) -> list:
+        """draws the graphic at the object center. Returns the areas drawn."""
         offset = pg.math.Vector2(self.graphic.get_rect().center)
-        window.blit(self.graphic, self.pos - offset)
+        return [window.blit(self.graphic, self.pos - offset)]
 
     def destroy(self):
         """Marks the object ready for destruction. Called by other Objects."""
@@ -28,40 +42,37 @@ class GameObject:
 
 class Door(GameObject):
     """The exit door of each level"""
-    def __init__(self, graphic: str, pos: Vector2, size: int = 100, height: int = 100) -> None:
-        super().__init__(graphic, pos, size, height)
-
+    __slots__ = ()
 
-class Coin(GameObject):
-    """The Coins that need to be collected"""
-    def __init__(self, graphic: str, pos: Vector2, size: int = 40, height: int = 40) -> None:
+    def __init__(self, graphic: str, pos: Vector2, size: int = 100, height: int = 100) -> None:
         super().__init__(graphic, pos, size, height)
 
 
 class DynamicObject(GameObject):
     """Object with movement and direction."""
+    __slots__ = ("vel", "max_vel", "agility", "rotations")
 
     def __init__(self, graphic: str, pos: Vector2, size: int = 100, height: int = 100) -> None:
         super().__init__(graphic, pos, size, height)
         self.vel = 0
         self.max_vel = 5
         self.agility = 3
+        self.rotations = rotation.rotation_cache(graphic)
 
     def move(self):
         """locomotion for the object"""
         self.pos = self.pos + self.heading.normalize() * self.vel
         self.hitbox.center = self.pos
 
-    def draw(self, window: pg.Surface):
+    def draw(self, window: pg.Surface) -> list:
         """rotates and draws graphic centered on pos"""
-        direction = Vector2(0, -1).angle_to(self.heading)
-        body = pg.transform.rotate(self.graphic, - direction),
-        offset = pg.math.Vector2(body[0].get_rect().center)
-        window.blit(body[0], self.pos - offset)
+        body, offset = self.rotations.get_heading(self.heading)
+        return [window.blit(body, self.pos - offset)]
 
 
 class Robot(DynamicObject):
     """Main Character. Can be controlled by the player."""
+    __slots__ = ("dir", "coins_collected", "won", "acceleration")
 
     def __init__(self, graphic: str, pos: Vector2, size: int = 50, height: int = 50) -> None:
         super().__init__(graphic, pos, size, height)
@@ -120,170 +131,209 @@ class Robot(DynamicObject):
             if event.key == pg.K_DOWN:
                 self.dir[1] += 1
 
-    def collide_with(self, objects: list) -> int:
-        """Detects and handles all collisions. Objects is a list of GameObjects.Returns coins collected on pickup. Return -1: Door Return -2: game over."""
-        for o in objects:
-            if self.hitbox.colliderect(o.hitbox):
-                # robot is colliding with object o
-                if isinstance(o, Coin):
-                    o.destroy()
-                    self.coins_collected += 1
-                    return self.coins_collected
-                elif isinstance(o, Door):
-                    return -1
-                elif isinstance(o, Ghost):
-                    return -2
-        return 0
-
-
-class Ghost(DynamicObject):
-    """Enemy Character. Spawns and flys towards Robot. Has a target."""
-
-    def __init__(self, graphic: str, pos: Vector2, target: GameObject, size: int = 50, height: int = 50) -> None:
-        super().__init__(graphic, pos, size, height)
-        self.target = target
-        self.vel = 4
-        self.agility = 1.5
-        self.heading = self.heading.rotate(randint(0, 359))
-
-    def update(self):
-        """Updates the Ghost by turning it into a homing missile"""
-        # find target
-        target_direction = self.target.pos - self.pos
-        angle_to_target = self.angle_between_vectors(
-            self.heading, target_direction)
-
-        # steer rocket
-        if angle_to_target > self.agility:
-            self.heading = self.heading.rotate(self.agility)
-        elif angle_to_target < -self.agility:
-            self.heading = self.heading.rotate(-self.agility)
-        else:
-            self.heading = target_direction.normalize()
-
-        self.move()
-
-    def angle_between_vectors(self, v1, v2):
-        """returns the angle in between v1 and v2 from 180° to -180° - thanks chatgpt for this one!"""
-        dot_product = v1[0] * v2[0] + v1[1] * v2[1]
-        magnitude_v1 = math.sqrt(v1[0]**2 + v1[1]**2)
-        magnitude_v2 = math.sqrt(v2[0]**2 + v2[1]**2)
-        cos_theta = dot_product / (magnitude_v1 * magnitude_v2)
-
-        if cos_theta > 1:
-            cos_theta = 1
-        elif cos_theta < -1:
-            cos_theta = -1
-
-        angle_radians = math.acos(cos_theta)
-        angle_degrees = math.degrees(angle_radians)
-
-        # Determine the sign of the angle using the cross product
-        cross_product = v1[0] * v2[1] - v1[1] * v2[0]
-        if cross_product < 0:
-            angle_degrees = -angle_degrees
-
-        return angle_degrees
-
 
 class Level:
     """Contains all objects for a game session"""
 
-    def __init__(self, window: pg.Surface, clock: pg.time.Clock, goal: int = 3, ghosts: int = 1) -> None:
+    def __init__(self, window: pg.Surface, clock: pg.time.Clock, goal: int = 3, ghosts: int = 1, inputs: object = None, headless: bool = False,
+                 render_mode: str = "dirty", seed: int = None, record: str = None, profile: bool = False,
+                 spec: dict = None, plan: LevelPlan = None) -> None:
+        """spec is a level of levels.json (default: goal coins and ghosts ghosts). plan is the
+        prepared level (see LevelLoader), without one it is built here from spec and seed."""
         self.window = window
+        if plan is None:
+            if spec is None:
+                spec = level_spec({"goal": goal, "ghosts": ghosts})
+            plan = LevelPlan(spec, window.get_size(), seed)
+        spec = plan.spec
+        # all randomness of the level comes from here, so a seed and the input replay it
+        self.seed = plan.seed
+        self.rng = plan.rng
         self.clock = clock
+        self.inputs = inputs if inputs is not None else PygameInput()
+        if record is not None:
+            # log the input of every tick for replay.py
+            self.inputs = InputRecorder(self.inputs, record, {"seed": self.seed, "level": spec})
+        self.headless = headless  # no rendering and no waiting for the clock
+        self.render_mode = render_mode  # "dirty" or "full" (redraw everything each frame)
+        self.renderer = DirtyRectRenderer(self.window, self.build_background())
+        # replaced by a PhaseTimer to measure the loop, profile keeps every frame for dump()
+        self.profile = profile
+        self.timer = PhaseTimer(history=True) if profile else NullTimer()
+        self.overlay = PerfOverlay()  # toggled with F3
         self.score = 0
-        self.goal = goal
-        self.ghosts = ghosts
-        self.door = Door("door.png", Vector2(self.random_location()))
-        self.player = Robot("robot.png", Vector2(
-            20, pg.display.get_surface().get_height() - 100))
-        self.coins_list = []
-        self.spawn_coins(self.goal)
-        self.ghost_list = []
-        self.spawn_ghosts(self.ghosts)
+        self.goal = spec["goal"]
+        self.ghosts = spec["ghosts"]
+        self.sprites = spec["sprites"]
+        self.door = Door(self.sprites["door"], plan.door)
+        self.player = Robot("robot.png", plan.robot)
+        self.coins_list = CoinField(self.sprites["coin"])
+        self.spawn_coins(plan.coins)
+        self.ghost_list = GhostSwarm(self.player, self.sprites["ghost"])
+        self.spawn_ghosts(plan.ghosts)
+        self.waves = list(plan.waves)  # [(tick, ghosts)] still to come
+        self.tick = 0
+
+        self.world = CollisionWorld()
+        self.world.add(self.player, PLAYER, ENEMY | PICKUP | EXIT)
+        self.world.add_group(self.coins_list, PICKUP)
+        self.world.add_group(self.ghost_list, ENEMY)
+        self.world.add(self.door, EXIT)
+        self.world.on(Robot, Coin, self.collect_coin)
+        self.world.on(Robot, Ghost, self.caught)
+        self.world.on(Robot, Door, self.reach_door)
+        self.result = None  # set by the collision handlers
+
+        for path, value in spec["params"].items():
+            set_param(self, path, value)
+
+    def build_background(self) -> pg.Surface:
+        """the empty floor the dirty rect renderer restores from"""
+        background = pg.Surface(self.window.get_size()).convert()
+        background.fill((200, 200, 200))
+        return background
 
     def run(self) -> str:
         """main loop of the game session"""
         while True:
+            result = self.step()
+            if result is not None:
+                self.timer.end_frame()
+                return result
+
+            if not self.headless:
+                self.render()
+            self.timer.end_frame()
+            if not self.headless:
+                self.clock.tick(60)
+
+    def close(self, interrupted: bool = False):
+        """finishes the input log of a recorded level, with the digest of its final state.
+        interrupted: the last tick read its events but wasn't played (the window was closed)"""
+        if isinstance(self.inputs, InputRecorder):
+            self.inputs.close(self.inputs.ticks - interrupted, digest(self))
+
+    def step(self) -> str:
+        """simulates one tick. Returns "won" or "lost" when the level is over."""
+        with self.timer.phase("events"):
             self.events()
 
+        with self.timer.phase("update.robot"):
             self.player.update()
-            for g in self.ghost_list:
-                g.update()
-
-            result = self.player.collide_with(
-                self.coins_list + self.ghost_list + [self.door])
+        with self.timer.phase("update.ghosts"):
+            while self.waves and self.waves[0][0] <= self.tick:
+                self.spawn_ghosts(self.waves.pop(0)[1])
+            self.ghost_list.update()
+        self.tick += 1
+
+        with self.timer.phase("collision.world"):
+            self.result = None
+            self.world.step()
+        if self.result is not None:
+            return self.result
+        with self.timer.phase("collision.coins"):
+            self.destroy_coins()
+        return None
 
-            if result > 0:
-                self.score = result
-            elif result == -1:
-                if self.score == self.goal:
-                    return "won"
-            elif result == -2:
-                return "lost"
+    def collect_coin(self, robot: "Robot", coin: "Coin"):
+        """collision handler"""
+        coin.destroy()
+        robot.coins_collected += 1
+        self.score = robot.coins_collected
 
-            self.destroy_coins()
+    def caught(self, robot: "Robot", ghost: "Ghost"):
+        """collision handler, getting caught ends the level even when standing in the door"""
+        self.result = "lost"
 
-            self.render()
-            self.clock.tick(60)
+    def reach_door(self, robot: "Robot", door: "Door"):
+        """collision handler, the level is won once all coins are collected"""
+        if self.score == self.goal and self.result is None:
+            self.result = "won"
 
     def events(self):
         """gets user input"""
-        for event in pg.event.get():
+        for event in self.inputs.events():
             if event.type == pg.QUIT:
+                self.close(interrupted=True)
                 exit()
+            if event.type == pg.KEYDOWN and event.key == pg.K_F3:
+                self.toggle_overlay()
+                continue
             if event.type == pg.KEYDOWN or event.type == pg.KEYUP:
                 self.player.control(event)
 
     def render(self):
         """Draw all content to the window"""
-        self.window.fill((200, 200, 200))
-
-        self.door.draw(self.window)
-
-        for c in self.coins_list:
-            c.draw(self.window)
-        for g in self.ghost_list:
-            g.draw(self.window)
-
-        self.player.draw(self.window)
-
-        font = pg.font.Font(None, 32)
-        score_str = f"Score: {self.score} / {self.goal}"
-        scroe_srf = font.render(score_str, True,  (10, 10, 10))
-
-        self.window.blit(scroe_srf, (20, 20))
-
-        pg.display.flip()
-
-    def random_location(self, margin: int = 50) -> tuple:
-        """returns a random location (tuple) with a safety margin"""
-        space_x = (margin, pg.display.get_surface().get_width() - margin)
-        space_y = (margin, pg.display.get_surface().get_height() - margin)
-        return (randint(space_x[0], space_x[1]), randint(space_y[0], space_y[1]))
-
-    def spawn_coins(self, amount: int = 3):
-        """Creates coins in random places"""
-        for i in range(amount):
-            self.coins_list.append(
-                Coin("coin.png", Vector2(self.random_location())))
-
-    def spawn_ghosts(self, amount: int = 1):
-        """Creates coins in random places"""
-        for i in range(amount):
-            self.ghost_list.append(
-                Ghost("monster.png", Vector2(self.random_location(200)), self.player))
+        with self.timer.phase("render.clear"):
+            if self.render_mode == "full":
+                self.window.fill((200, 200, 200))
+            else:
+                self.renderer.clear()
+
+        with self.timer.phase("render.door"):
+            rects = self.door.draw(self.window)
+        with self.timer.phase("render.coins"):
+            rects += self.coins_list.draw(self.window)
+        with self.timer.phase("render.ghosts"):
+            rects += self.ghost_list.draw(self.window)
+        with self.timer.phase("render.robot"):
+            rects += self.player.draw(self.window)
+
+        with self.timer.phase("ui.score"):
+            score_str = f"Score: {self.score} / {self.goal}"
+            scroe_srf = render_text(score_str, 32, (10, 10, 10))
+
+            rects.append(self.window.blit(scroe_srf, (20, 20)))
+        if self.overlay.visible:
+            with self.timer.phase("ui.overlay"):
+                rects += self.overlay.draw(self.window, self.timer, self.perf_counts())
+
+        with self.timer.phase("render.present"):
+            if self.render_mode == "full":
+                pg.display.flip()
+            else:
+                self.renderer.present(rects)
+
+    def perf_counts(self) -> dict:
+        """entity counts shown by the perf overlay"""
+        return {"coins": len(self.coins_list), "ghosts": len(self.ghost_list)}
+
+    def toggle_overlay(self):
+        """shows or hides the perf overlay, the loop is only timed while it is shown or profiled"""
+        self.overlay.toggle()
+        if self.overlay.visible and not self.timer.enabled:
+            self.timer = PhaseTimer()
+        elif not self.overlay.visible and not self.profile:
+            self.timer = NullTimer()
+
+    def memory_report(self) -> dict:
+        """memory used by the live entities (see memory.report()) and the rotation caches"""
+        result = memory.report({
+            "coins": self.coins_list,
+            "ghosts": self.ghost_list,
+            "robot": [self.player],
+            "door": [self.door],
+        })
+        total = result.pop("total")
+        result["ghost_arrays"] = self.ghost_list.memory()
+        result["coin_arrays"] = self.coins_list.memory()
+        result["total"] = total + result["ghost_arrays"] + result["coin_arrays"]
+        # shared by all entities, not part of the total
+        result["rotation_cache"] = rotation.report()
+        return result
+
+    def spawn_coins(self, positions: list):
+        """Creates coins at the positions of the plan"""
+        for pos in positions:
+            self.coins_list.spawn(pos)
+
+    def spawn_ghosts(self, ghosts: list):
+        """Creates ghosts from the (pos, heading) list of the plan"""
+        for pos, heading in ghosts:
+            self.ghost_list.spawn(pos, heading)
 
     def destroy_coins(self):
-        destroy_list = []
-        for c in self.coins_list:
-            if c.is_destroyed:
-                destroy_list.append(c)
-
-        for c in destroy_list:
-            if c in self.coins_list:
-                self.coins_list.remove(c)
+        self.coins_list.remove_collected()
 
 
 class Button:
@@ -295,16 +345,16 @@ class Button:
             pg.display.get_surface().get_width()//2, pos_y)
         self.pressed = False
 
-    def draw(self, window: pg.Surface):
+    def draw(self, window: pg.Surface) -> list:
         color = (10, 10, 10)
-        font = pg.font.Font(None, 36)
-        text = font.render(self.text, True, color)
+        text = render_text(self.text, 36, color)
         offset = pg.math.Vector2(text.get_rect().center)
 
         if self.hover:
             pg.draw.rect(window, (100, 100, 100), self.shape)
         pg.draw.rect(window, color, self.shape, width=2)
         window.blit(text, self.shape.center - offset)
+        return [self.shape.copy()]
 
     def update(self):
         if self.shape.collidepoint(pg.mouse.get_pos()):
@@ -326,47 +376,59 @@ class Button:
 class Application:
     """Main Application Class"""
 
-    # level (coins to collect, ghosts to avoid)
-    levels = {
-        1: (3, 1),
-        2: (5, 1),
-        3: (3, 2),
-        4: (5, 2),
-        5: (200, 2),
-        6: (1, 3),
-        7: (1, 8),
-        8: (100, 100)
-    }
-
-    def __init__(self) -> None:
+    def __init__(self, render_mode: str = "dirty", record: str = None, profile: str = None) -> None:
         pg.init()
         self.clock = pg.time.Clock()
         self.window = pg.display.set_mode((800, 600))
+        preload()
+        rotation.preload(["robot.png", "monster.png"])
+        self.levels = load_levels()  # {number: spec}, see levels.py
+        # the coming level is prepared in the background while the menu or a level is shown
+        self.loader = LevelLoader(self.levels, self.window.get_size())
         self.level = 1
+        self.loader.prefetch(self.level)
         self.state = "default"
         self.buttons = {
             "play": Button("Play Game", pos_y=420),
             "exit": Button("Exit", pos_y=500)
         }
+        self.render_mode = render_mode  # "dirty" or "full"
+        self.renderer = DirtyRectRenderer(self.window, self.build_background())
+        self.record = record  # folder for the input logs of all levels, None = no recording
+        if record is not None:
+            os.makedirs(record, exist_ok=True)
+        self.profile = profile  # file the frame times of all levels are appended to, None = no profiling
 
     def run(self):
         while True:
             self.events()
             if self.buttons["play"].update():
-                g = Level(self.window, self.clock,
-                          goal=Application.levels[self.level][0], ghosts=Application.levels[self.level][1])
+                log = None
+                if self.record is not None:
+                    log = os.path.join(self.record, f"{int(time.time())}-level{self.level}.replay")
+                g = Level(self.window, self.clock, plan=self.loader.get(self.level),
+                          render_mode=self.render_mode, record=log, profile=self.profile is not None)
+                # a retry and the next level are ready by the time this one ends
+                self.loader.prefetch(self.level)
+                self.loader.prefetch(self.level + 1)
                 self.state = g.run()
+                g.close()
+                if self.profile is not None:
+                    g.timer.dump(self.profile)
                 if self.state == "won":
                     self.level += 1
                     self.buttons["play"].text = "Next Level"
-                    if self.level not in Application.levels:
+                    if self.level not in self.levels:
                         self.state = "finished"
                         self.level = 1
+                        self.loader.prefetch(self.level)
                         self.buttons["play"].text = "Play Again"
                 if self.state == "lost":
                     self.buttons["play"].text = "Try Again"
+                self.renderer.set_background(self.build_background())
 
             if self.buttons["exit"].update():
+                self.loader.close()
                 exit()
 
             self.render()
@@ -380,43 +442,65 @@ class Application:
                 for i, b in self.buttons.items():
                     b.click()
 
-    def render(self):
-        self.window.fill((200, 200, 200))
+    def draw_screen(self, surface: pg.Surface):
+        """draws the texts for the current state without the buttons"""
+        surface.fill((200, 200, 200))
         string = "Collect all coins and exit whitout getting caught!"
         string2 = "Arrow Keys: Move Player"
 
         color = (10, 10, 10)
-        font = pg.font.Font(None, 36)
 
-        text = font.render(string, True, color)
+        text = render_text(string, 36, color)
         offset = pg.math.Vector2(text.get_rect().center)
-        self.window.blit(text, (400, 150) - offset)
+        surface.blit(text, (400, 150) - offset)
 
-        text = font.render(string2, True, color)
+        text = render_text(string2, 36, color)
         offset = pg.math.Vector2(text.get_rect().center)
-        self.window.blit(text, (400, 200) - offset)
+        surface.blit(text, (400, 200) - offset)
 
         if self.state == "won":
             string = f"You won Level {self.level-1}! Congrats!"
-            text = font.render(string, True, color)
+            text = render_text(string, 36, color)
             offset = pg.math.Vector2(text.get_rect().center)
-            self.window.blit(text, (400, 300) - offset)
+            surface.blit(text, (400, 300) - offset)
         elif self.state == "lost":
             string = f"You lost Level {self.level}! Better luck next time"
-            text = font.render(string, True, color)
+            text = render_text(string, 36, color)
             offset = pg.math.Vector2(text.get_rect().center)
-            self.window.blit(text, (400, 300) - offset)
+            surface.blit(text, (400, 300) - offset)
         elif self.state == "finished":
             string = f"You beat the game. You're a true master of gaming!"
-            text = font.render(string, True, color)
+            text = render_text(string, 36, color)
             offset = pg.math.Vector2(text.get_rect().center)
-            self.window.blit(text, (400, 300) - offset)
+            surface.blit(text, (400, 300) - offset)
 
-        for i, b in self.buttons.items():
-            b.draw(self.window)
+    def build_background(self) -> pg.Surface:
+        background = pg.Surface(self.window.get_size()).convert()
+        self.draw_screen(background)
+        return background
 
-        pg.display.flip()
+    def render(self):
+        if self.render_mode == "full":
+            self.draw_screen(self.window)
+        else:
+            self.renderer.clear()
 
+        rects = []
+        for i, b in self.buttons.items():
+            rects += b.draw(self.window)
 
-app = Application()
-app.run()
+        if self.render_mode == "full":
+            pg.display.flip()
+        else:
+            self.renderer.present(rects)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--render-mode", choices=("dirty", "full"), default="dirty",
+                        help="dirty rect updates or a full redraw and flip every frame (default: dirty)")
+    parser.add_argument("--record", metavar="FOLDER", help="record the input of every level for replay.py")
+    parser.add_argument("--profile", metavar="FILE", help="append the frame times of every level to FILE (JSON lines)")
+    args = parser.parse_args()
+    app = Application(render_mode=args.render_mode, record=args.record, profile=args.profile)
+    app.run()
@@ -0,0 +1,51 @@
+# memory footprint of the game entities
+import sys
+import pygame
+
+
+def attribute_values(obj: object) -> list:
+    """values of the instance attributes, stored in __dict__ and/or __slots__"""
+    values = list(getattr(obj, "__dict__", {}).values())
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if name.startswith("__") and not name.endswith("__"):
+                name = f"_{cls.__name__.lstrip('_')}{name}"
+            if hasattr(obj, name):
+                values.append(getattr(obj, name))
+    return values
+
+
+def entity_bytes(obj: object) -> int:
+    """bytes of one entity: the object, its __dict__ and the vectors, rects and lists it owns.
+    Shared data like sprites and rotation caches is not counted."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    for value in attribute_values(obj):
+        if isinstance(value, (pygame.math.Vector2, pygame.Rect)):
+            size += sys.getsizeof(value)
+        elif isinstance(value, list):
+            size += sys.getsizeof(value)
+            vectors = {id(v): v for v in value if isinstance(v, pygame.math.Vector2)}
+            size += sum(sys.getsizeof(v) for v in vectors.values())
+    return size
+
+
+def report(groups: dict) -> dict:
+    """returns {name: {count, bytes_per_entity, bytes}} for every group of entities plus the total bytes"""
+    result = {}
+    total = 0
+    for name, entities in groups.items():
+        sizes = [entity_bytes(e) for e in entities]
+        nbytes = sum(sizes)
+        result[name] = {
+            "count": len(sizes),
+            "bytes_per_entity": nbytes // len(sizes) if sizes else 0,
+            "bytes": nbytes,
+        }
+        total += nbytes
+    result["total"] = total
+    return result
@@ -0,0 +1,182 @@
+# timing of the game loop. Scopes are named "phase.part" (e.g. "update.projectiles"),
+# the phases are events, update, collision, render and ui.
+import json
+import time
+from collections import deque
+import numpy as np
+import pygame as pg
+from text import get_font
+
+
+class Scope:
+    """Context manager adding the time spent inside it to one scope of a PhaseTimer."""
+
+    def __init__(self, timer: "PhaseTimer", name: str) -> None:
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullScope:
+    """Scope that measures nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SCOPE = NullScope()
+
+
+class PhaseTimer:
+    """Accumulates the time spent in named scopes of the game loop. Keeps the times of the
+    last window frames for percentiles and, with history, every frame for dump()."""
+
+    enabled = True
+
+    def __init__(self, window: int = 300, history: bool = False) -> None:
+        self.totals = {}
+        self.scopes = {}
+        self.current = {}  # seconds per scope in the running frame
+        self.samples = {}  # scope -> seconds of the last frames
+        self.window = window
+        self.frame_times = deque(maxlen=window)
+        self.history = [] if history else None
+        self.frames = 0
+        self.frame_start = time.perf_counter()
+
+    def phase(self, name: str) -> Scope:
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = Scope(self, name)
+            self.scopes[name] = scope
+        return scope
+
+    def add(self, name: str, seconds: float):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def end_frame(self):
+        """closes the running frame, call once per presented frame"""
+        now = time.perf_counter()
+        self.frame_times.append(now - self.frame_start)
+        self.frame_start = now
+
+        for name, seconds in self.current.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+        for name, samples in self.samples.items():
+            if name not in self.current:
+                samples.append(0.0)
+
+        if self.history is not None:
+            frame = {"frame": self.frames, "frame_ms": self.frame_times[-1] * 1000}
+            frame.update((name, seconds * 1000) for name, seconds in self.current.items())
+            self.history.append(frame)
+        self.current.clear()
+        self.frames += 1
+
+    def report(self, frames: int, detail: bool = False) -> dict:
+        """milliseconds per frame for every phase, or for every scope with detail"""
+        result = {}
+        for name, total in self.totals.items():
+            if not detail:
+                name = name.split(".")[0]
+            result[name] = result.get(name, 0.0) + total * 1000 / frames
+        return result
+
+    def percentiles(self, name: str = None) -> dict:
+        """p50, p95 and p99 in milliseconds over the last frames, of one scope or the whole frame"""
+        samples = self.frame_times if name is None else self.samples.get(name, ())
+        if not samples:
+            return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+        p50, p95, p99 = (np.percentile(np.fromiter(samples, float, len(samples)), (50, 95, 99)) * 1000).tolist()
+        return {"p50": p50, "p95": p95, "p99": p99}
+
+    def top(self, count: int = 5, key: str = "p95") -> list:
+        """the scopes with the highest percentile, [(name, percentiles)]"""
+        ranking = [(name, self.percentiles(name)) for name in self.samples]
+        ranking.sort(key=lambda item: item[1][key], reverse=True)
+        return ranking[:count]
+
+    def dump(self, path: str):
+        """appends one JSON line per frame (the whole history, or the last frames) to a file"""
+        if self.history is not None:
+            frames = self.history
+        else:
+            names = list(self.samples)
+            first = self.frames - len(self.frame_times)
+            frames = []
+            for i, frame_time in enumerate(self.frame_times):
+                frame = {"frame": first + i, "frame_ms": frame_time * 1000}
+                for name in names:
+                    samples = self.samples[name]
+                    # scopes seen for the first time later on have fewer samples
+                    j = i - (len(self.frame_times) - len(samples))
+                    if j >= 0:
+                        frame[name] = samples[j] * 1000
+                frames.append(frame)
+        with open(path, "a") as f:
+            for frame in frames:
+                f.write(json.dumps(frame) + "\n")
+
+
+class NullTimer:
+    """Timer used when nothing is measured."""
+
+    enabled = False
+
+    def phase(self, name: str) -> NullScope:
+        return NULL_SCOPE
+
+    def end_frame(self):
+        pass
+
+
+class PerfOverlay:
+    """On-screen text with the frame time percentiles, entity counts and the slowest scopes.
+    The text is only rendered again every refresh frames."""
+
+    def __init__(self, refresh: int = 30, size: int = 18) -> None:
+        self.visible = False
+        self.refresh = refresh
+        self.size = size
+        self.frame = 0
+        self.surface = None
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.surface = None
+
+    def lines(self, timer: PhaseTimer, counts: dict) -> list:
+        frame = timer.percentiles()
+        lines = [f"frame  p50 {frame['p50']:.1f}  p95 {frame['p95']:.1f}  p99 {frame['p99']:.1f} ms",
+                 "  ".join(f"{name} {count}" for name, count in counts.items()),
+                 "slowest (p95):"]
+        for name, p in timer.top():
+            lines.append(f"  {name}  {p['p95']:.2f} ms")
+        return lines
+
+    def draw(self, window: pg.Surface, timer: PhaseTimer, counts: dict) -> list:
+        if self.surface is None or self.frame % self.refresh == 0:
+            font = get_font(self.size)
+            rendered = [font.render(line, True, (240, 240, 240)) for line in self.lines(timer, counts)]
+            height = font.get_linesize()
+            self.surface = pg.Surface((max(r.get_width() for r in rendered) + 10, height * len(rendered) + 10))
+            self.surface.fill((30, 30, 30))
+            for i, r in enumerate(rendered):
+                self.surface.blit(r, (5, 5 + i * height))
+        self.frame += 1
+        return [window.blit(self.surface, (10, window.get_height() - self.surface.get_height() - 10))]
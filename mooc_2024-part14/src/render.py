@@ -0,0 +1,44 @@
+# dirty rectangle rendering. Instead of redrawing and flipping the whole window,
+# only the areas that changed since the last frame are restored and updated.
+import pygame as pg
+
+# above this many rects a single flip is cheaper than updating every rect
+MAX_RECTS = 300
+
+
+class DirtyRectRenderer:
+    """Keeps a cached background and the areas drawn in the previous frame.
+    Every frame those areas are restored from the background, the scene is
+    drawn on top and only the old and new areas are pushed to the display."""
+
+    def __init__(self, window: pg.Surface, background: pg.Surface) -> None:
+        self.window = window
+        self.background = background
+        self.previous = []
+        self.full = True  # the next frame redraws and flips everything
+
+    def set_background(self, background: pg.Surface):
+        self.background = background
+        self.invalidate()
+
+    def invalidate(self):
+        """forces a full redraw on the next frame"""
+        self.full = True
+
+    def clear(self):
+        """restores the background below everything drawn in the last frame"""
+        if self.full or len(self.previous) > MAX_RECTS:
+            # that many areas overlap a lot, one blit of the whole window is cheaper
+            self.window.blit(self.background, (0, 0))
+        else:
+            self.window.blits([(self.background, r, r) for r in self.previous], doreturn=False)
+
+    def present(self, rects: list):
+        """pushes the areas drawn in this and the last frame to the display"""
+        dirty = self.previous + rects
+        if self.full or len(dirty) > MAX_RECTS:
+            pg.display.flip()
+            self.full = False
+        else:
+            pg.display.update(dirty)
+        self.previous = rects
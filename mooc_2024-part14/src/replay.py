@@ -0,0 +1,211 @@
+# input recording and replay. A log holds the settings of a level (seed and the level spec)
+# and the events and mouse position of every tick in a compact binary format, so the
+# level can be played again headless, bit for bit and as fast as possible.
+#
+#   python main.py --record logs              records every level into the logs folder
+#   python replay.py logs/1700000000.replay   replays a log and prints the outcome
+#   python replay.py game.replay --slowest 10 --render   times every tick, lists the slowest
+import argparse
+import hashlib
+import json
+import os
+import struct
+import time
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is for the results, not the pygame banner
+import pygame as pg
+
+MAGIC = b"GPIR"
+VERSION = 2  # version 1 logs have no trailer
+HEADER = struct.Struct("<BI")  # version, length of the JSON settings
+
+# every tick starts with a flags byte, followed by the mouse position if it moved and
+# the events if there are any
+MOUSE_MOVED = 1
+HAS_EVENTS = 2
+POS = struct.Struct("<dd")
+COUNT = struct.Struct("<H")
+# type, attribute holding the code (see CODES), code, has a pos
+EVENT = struct.Struct("<IBiB")
+CODES = (None, "key", "button")
+# flags byte of the trailer written by close(): ticks played and the digest() after them
+END = 255
+TRAILER = struct.Struct("<I20s")
+
+
+class InputRecorder:
+    """Wraps an input source and writes everything it delivers into a log file.
+    The mouse is read once per tick, together with the events."""
+
+    def __init__(self, source: object, path: str, settings: dict) -> None:
+        self.source = source
+        self.file = open(path, "wb")
+        header = json.dumps(settings).encode()
+        self.file.write(MAGIC + HEADER.pack(VERSION, len(header)) + header)
+        self.pos = None
+        self.ticks = 0  # ticks logged so far
+
+    def events(self) -> list:
+        self.ticks += 1
+        events = self.source.events()
+        pos = tuple(self.source.mouse_pos())
+
+        flags = 0
+        if pos != self.pos:
+            flags |= MOUSE_MOVED
+        if events:
+            flags |= HAS_EVENTS
+        data = [bytes((flags,))]
+        if flags & MOUSE_MOVED:
+            data.append(POS.pack(*pos))
+        if flags & HAS_EVENTS:
+            data.append(COUNT.pack(len(events)))
+            for event in events:
+                kind = 0
+                for i, name in enumerate(CODES[1:], 1):
+                    if hasattr(event, name):
+                        kind = i
+                        break
+                code = getattr(event, CODES[kind]) if kind else 0
+                has_pos = hasattr(event, "pos")
+                data.append(EVENT.pack(event.type, kind, code, has_pos))
+                if has_pos:
+                    data.append(POS.pack(*event.pos))
+        self.file.write(b"".join(data))
+
+        self.pos = pos
+        return events
+
+    def mouse_pos(self) -> tuple:
+        return self.pos
+
+    def close(self, ticks: int = None, digest: str = None):
+        """finishes the log. With a digest, a trailer stores it with the number of ticks
+        played (default: all logged) so replay() can check the replay against it."""
+        if digest is not None:
+            ticks = self.ticks if ticks is None else ticks
+            self.file.write(bytes((END,)) + TRAILER.pack(ticks, bytes.fromhex(digest)))
+        self.file.close()
+
+
+def load(path: str) -> tuple:
+    """reads a log and returns (settings, ticks, trailer), ticks is a list of (events, mouse
+    position), trailer is {"ticks", "digest"} of the recorded run or None"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not an input log")
+    version, length = HEADER.unpack_from(data, 4)
+    if version not in (1, VERSION):
+        raise ValueError(f"{path} has version {version}, expected {VERSION}")
+    offset = 4 + HEADER.size
+    settings = json.loads(data[offset:offset + length])
+    offset += length
+
+    ticks = []
+    trailer = None
+    pos = (0, 0)
+    while offset < len(data):
+        flags = data[offset]
+        offset += 1
+        if flags == END:
+            played, digest = TRAILER.unpack_from(data, offset)
+            trailer = {"ticks": played, "digest": digest.hex()}
+            break
+        if flags & MOUSE_MOVED:
+            pos = POS.unpack_from(data, offset)
+            offset += POS.size
+        events = []
+        if flags & HAS_EVENTS:
+            count, = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            for i in range(count):
+                event_type, kind, code, has_pos = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                attributes = {CODES[kind]: code} if kind else {}
+                if has_pos:
+                    attributes["pos"] = POS.unpack_from(data, offset)
+                    offset += POS.size
+                events.append(pg.event.Event(event_type, **attributes))
+        ticks.append((events, pos))
+    return settings, ticks, trailer
+
+
+class ReplayInput:
+    """Plays back the ticks of a log. After the last tick nothing happens anymore."""
+
+    def __init__(self, ticks: list) -> None:
+        self.ticks = ticks
+        self.tick = -1
+        self.pos = ticks[0][1] if ticks else (0, 0)
+
+    def events(self) -> list:
+        self.tick += 1
+        if self.tick >= len(self.ticks):
+            return []
+        events, self.pos = self.ticks[self.tick]
+        return events
+
+    def mouse_pos(self) -> tuple:
+        return self.pos
+
+
+def digest(level: object) -> str:
+    """fingerprint of the simulation state, equal digests mean a replay matched bit for bit"""
+    h = hashlib.sha1()
+    robot = level.player
+    h.update(repr((tuple(robot.pos), tuple(robot.heading), robot.vel, level.score)).encode())
+    h.update(repr([(tuple(g.pos), tuple(g.heading)) for g in level.ghost_list]).encode())
+    h.update(repr([tuple(c.pos) for c in level.coins_list]).encode())
+    return h.hexdigest()
+
+
+def replay(path: str, render: bool = False, slowest: int = 0) -> dict:
+    """replays a log headless as fast as possible"""
+    from headless import init_headless
+    from main import Level
+    from levels import level_spec
+
+    settings, ticks, trailer = load(path)
+    if trailer is not None:
+        # a closed window ends the log with a tick that was read but not played
+        ticks = ticks[:trailer["ticks"]]
+    window = init_headless()
+    # logs written before levels.json only know the number of coins and ghosts
+    spec = level_spec(settings.get("level") or {"goal": settings["goal"], "ghosts": settings["ghosts"]})
+    level = Level(window, pg.time.Clock(), spec=spec, inputs=ReplayInput(ticks), headless=True,
+                  seed=settings["seed"])
+
+    times = []
+    result = None
+    start = time.perf_counter()
+    for tick in range(len(ticks)):
+        tick_start = time.perf_counter()
+        result = level.step()
+        if render:
+            level.render()
+        times.append(time.perf_counter() - tick_start)
+        if result is not None:
+            break
+    seconds = time.perf_counter() - start
+
+    outcome = {
+        "result": result,
+        "ticks": len(times),
+        "seconds": round(seconds, 4),
+        "digest": digest(level),
+    }
+    # null for logs without a trailer
+    outcome["match"] = outcome["digest"] == trailer["digest"] if trailer is not None else None
+    if slowest:
+        ranking = sorted(range(len(times)), key=lambda i: times[i], reverse=True)[:slowest]
+        outcome["slowest"] = [{"tick": i, "ms": round(times[i] * 1000, 4)} for i in ranking]
+    return outcome
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="replays a recorded level headless")
+    parser.add_argument("log")
+    parser.add_argument("--render", action="store_true", help="also render every tick (dummy display)")
+    parser.add_argument("--slowest", type=int, default=0, help="list the N slowest ticks")
+    args = parser.parse_args()
+    print(json.dumps(replay(args.log, args.render, args.slowest)))
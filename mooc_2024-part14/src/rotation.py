@@ -0,0 +1,64 @@
+# pre-rotated sprite atlas. Rotating a surface every frame is expensive, so each
+# sprite is rotated once per angle bucket and drawing becomes a lookup + blit.
+import pygame as pg
+from assets import load_image
+
+# number of angle buckets per sprite. 180 buckets = 2° steps.
+BUCKETS = 180
+
+UP = pg.math.Vector2(0, -1)
+
+_caches = {}
+
+
+class RotationCache:
+    """All rotations of one sprite, together with the offset that centers each of them."""
+
+    def __init__(self, image: pg.Surface, buckets: int = BUCKETS) -> None:
+        self.buckets = buckets
+        self.step = 360 / buckets
+        self.frames = []
+        for i in range(buckets):
+            rotated = pg.transform.rotate(image, - i * self.step)
+            offset = pg.math.Vector2(rotated.get_rect().center)
+            if rotated.get_flags() & pg.SRCALPHA:
+                # run-length encoded, blits skip the transparent runs instead of blending every pixel
+                rotated.set_alpha(255, pg.RLEACCEL)
+            self.frames.append((rotated, offset))
+
+    def get(self, angle: float) -> tuple:
+        """returns (surface, offset) for an angle in degrees measured clockwise from Y-"""
+        return self.frames[round(angle / self.step) % self.buckets]
+
+    def get_heading(self, heading: pg.math.Vector2) -> tuple:
+        """returns (surface, offset) for a sprite pointing along heading"""
+        return self.get(UP.angle_to(heading))
+
+    def memory(self) -> int:
+        """bytes used by all rotated surfaces"""
+        return sum(s.get_bytesize() * s.get_width() * s.get_height() for s, _ in self.frames)
+
+
+def rotation_cache(path: str, buckets: int = None) -> RotationCache:
+    """returns the shared rotation cache for an image file"""
+    if buckets is None:
+        buckets = BUCKETS
+    key = (path, buckets)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = RotationCache(load_image(path), buckets)
+        _caches[key] = cache
+    return cache
+
+
+def preload(paths: list, buckets: int = None):
+    """builds the rotation caches up front so the first frame doesn't stall"""
+    for path in paths:
+        rotation_cache(path, buckets)
+
+
+def report() -> dict:
+    """returns {"path@buckets": bytes} for every cache plus the total"""
+    result = {f"{path}@{buckets}": cache.memory() for (path, buckets), cache in _caches.items()}
+    result["total"] = sum(result.values())
+    return result
@@ -0,0 +1,127 @@
+# ghost swarm. All ghosts are rows of one ecs.Table and are steered, moved, collided and
+# drawn together. Besides chasing their target they keep apart from and align with the
+# ghosts around them, the neighbours are found with the grid broadphase of spatial.py.
+import numpy as np
+import pygame as pg
+import ecs
+from ecs import Table, Column, Entity, TRANSFORM
+from spatial import overlapping_pairs
+from rotation import rotation_cache
+
+
+class Ghost(Entity):
+    """Enemy Character. One ghost of a GhostSwarm, a view on its row of the swarm table."""
+    __slots__ = ("swarm",)
+
+    def __init__(self, swarm: "GhostSwarm") -> None:
+        super().__init__(swarm.table)
+        self.swarm = swarm
+
+    @property
+    def hitbox(self) -> pg.Rect:
+        rect = pg.Rect(0, 0, self.swarm.size, self.swarm.size)
+        rect.center = self.pos
+        return rect
+
+
+class GhostSwarm:
+    """All ghosts of a level, flying towards one shared target. Indexed collision group:
+    answers collide_rect() with one numpy test over all ghosts."""
+
+    pos = Column()
+    heading = Column()
+
+    def __init__(self, target: object, graphic: str = "monster.png", size: int = 50, capacity: int = 64) -> None:
+        self.target = target
+        self.rotations = rotation_cache(graphic)
+        self.size = size  # hitbox width and height
+        self.vel = 4
+        self.agility = 1.5  # degrees per tick
+        self.radius = 40  # ghosts closer than this are neighbours
+        self.separation = 1.5  # weight of moving away from close neighbours
+        self.alignment = 0.5  # weight of flying like the neighbours
+        self.table = Table(TRANSFORM, capacity=capacity)
+        self.members = self.table.owners  # Ghost views, members[i].slot == i
+
+    @property
+    def count(self) -> int:
+        return self.table.count
+
+    def memory(self) -> int:
+        """bytes of the table rows used by the ghosts"""
+        return self.table.memory()
+
+    def spawn(self, pos: pg.Vector2, heading: pg.Vector2) -> Ghost:
+        ghost = Ghost(self)
+        self.table.add(ghost, pos=tuple(pos), heading=tuple(heading))
+        return ghost
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def neighbours(self) -> tuple:
+        """index arrays (i, j) of every pair of ghosts closer than radius, and their offsets pos[j] - pos[i]"""
+        n = self.count
+        r = self.radius
+        left, top = self.pos[:n, 0] - r / 2, self.pos[:n, 1] - r / 2
+        side = np.full(n, float(r))
+        i, j = overlapping_pairs(left, top, side, side, cell_size=r)
+        offset = self.pos[j] - self.pos[i]
+        close = np.einsum("ij,ij->i", offset, offset) < r * r
+        return i[close], j[close], offset[close]
+
+    def flocking(self) -> np.ndarray:
+        """separation and alignment, one (n, 2) steering offset per ghost"""
+        n = self.count
+        i, j, offset = self.neighbours()
+        if len(i) == 0:
+            return np.zeros((n, 2))
+
+        # push apart, stronger the closer two ghosts are
+        dist = np.hypot(offset[:, 0], offset[:, 1])
+        dist = np.maximum(dist, 1e-6)
+        push = offset * ((self.radius - dist) / (self.radius * dist))[:, None]
+        away = np.empty((n, 2))
+        for axis in range(2):
+            away[:, axis] = (np.bincount(j, push[:, axis], n) - np.bincount(i, push[:, axis], n))
+
+        # average heading of the neighbours
+        length = np.hypot(self.heading[:n, 0], self.heading[:n, 1])
+        unit = self.heading[:n] / np.maximum(length, 1e-6)[:, None]
+        neighbours = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+        along = np.empty((n, 2))
+        for axis in range(2):
+            along[:, axis] = np.bincount(i, unit[j, axis], n) + np.bincount(j, unit[i, axis], n)
+        along /= np.maximum(neighbours, 1)[:, None]
+
+        return self.separation * away + self.alignment * along
+
+    def update(self):
+        """steers every ghost towards the target and its neighbours, then moves it"""
+        n = self.count
+        if n == 0:
+            return
+        pos = self.pos[:n]
+
+        # the target direction is shared by all ghosts, the flocking bends it per ghost
+        towards = np.array(tuple(self.target.pos)) - pos
+        length = np.hypot(towards[:, 0], towards[:, 1])
+        towards /= np.maximum(length, 1e-6)[:, None]
+        desired = towards + self.flocking()
+
+        ecs.steer_to(self.table, desired, agility=self.agility)
+        ecs.move(self.table, vel=self.vel, normalize=True)
+
+    def collide_rect(self, rect: pg.Rect) -> list:
+        """returns the ghosts whose hitbox collides with rect"""
+        hit = ecs.collide_rect(self.table, rect, size=self.size)
+        return [self.members[i] for i in np.flatnonzero(hit).tolist()]
+
+    def draw(self, window: pg.Surface) -> list:
+        """draws all ghosts in one blits() call"""
+        if self.count == 0:
+            return []
+        return ecs.draw_rotated(window, self.table, self.rotations)
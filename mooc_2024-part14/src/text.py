@@ -0,0 +1,42 @@
+# cached text rendering. Fonts are created once and rendered strings are kept in
+# a small LRU cache, so HUDs and buttons only re-render when their text changes.
+from collections import OrderedDict
+import pygame as pg
+
+# rendered strings kept before the least recently used ones are dropped
+MAX_ENTRIES = 256
+
+_fonts = {}
+_surfaces = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_font(size: int, name: str = None) -> pg.font.Font:
+    """returns the shared font for (name, size)"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = pg.font.Font(name, size)
+        _fonts[key] = font
+    return font
+
+
+def render_text(text: str, size: int, color: tuple, name: str = None) -> pg.Surface:
+    """returns the rendered (antialiased) text. Surfaces are shared, don't draw on them."""
+    key = (name, size, text, color)
+    surface = _surfaces.get(key)
+    if surface is not None:
+        _surfaces.move_to_end(key)
+        _stats["hits"] += 1
+        return surface
+
+    _stats["misses"] += 1
+    surface = get_font(size, name).render(text, True, color)
+    _surfaces[key] = surface
+    if len(_surfaces) > MAX_ENTRIES:
+        _surfaces.popitem(last=False)
+    return surface
+
+
+def cache_info() -> dict:
+    return {"fonts": len(_fonts), "entries": len(_surfaces), **_stats}